@@ -2,6 +2,8 @@
 Constants and default patterns for TreeCatt
 """
 
+import os
+
 # Patterns ignored by default
 DEFAULT_IGNORE = {
     'node_modules', '__pycache__', '.git', '.svn', '.hg',
@@ -45,4 +47,39 @@ BINARY_EXTENSIONS = {
     '.ttf', '.otf', '.woff', '.woff2', '.eot',
     # Other
     '.swf', '.jar', '.war', '.ear'
-}
\ No newline at end of file
+}
+
+# Language names for the line statistics report (other extensions are shown as-is)
+LANGUAGE_EXTENSIONS = {
+    '.py': 'Python', '.pyi': 'Python', '.pyx': 'Cython',
+    '.js': 'JavaScript', '.mjs': 'JavaScript', '.cjs': 'JavaScript', '.jsx': 'JavaScript',
+    '.ts': 'TypeScript', '.tsx': 'TypeScript',
+    '.c': 'C', '.h': 'C/C++ Header', '.hpp': 'C/C++ Header', '.hh': 'C/C++ Header',
+    '.cc': 'C++', '.cpp': 'C++', '.cxx': 'C++',
+    '.cs': 'C#', '.java': 'Java', '.kt': 'Kotlin', '.kts': 'Kotlin', '.scala': 'Scala',
+    '.go': 'Go', '.rs': 'Rust', '.swift': 'Swift', '.m': 'Objective-C', '.mm': 'Objective-C++',
+    '.rb': 'Ruby', '.php': 'PHP', '.pl': 'Perl', '.pm': 'Perl', '.lua': 'Lua', '.r': 'R',
+    '.sh': 'Shell', '.bash': 'Shell', '.zsh': 'Shell', '.fish': 'Shell', '.ps1': 'PowerShell',
+    '.html': 'HTML', '.htm': 'HTML', '.css': 'CSS', '.scss': 'SCSS', '.sass': 'Sass', '.less': 'Less',
+    '.vue': 'Vue', '.svelte': 'Svelte',
+    '.json': 'JSON', '.yaml': 'YAML', '.yml': 'YAML', '.toml': 'TOML', '.xml': 'XML',
+    '.ini': 'INI', '.cfg': 'INI', '.sql': 'SQL', '.proto': 'Protocol Buffers',
+    '.md': 'Markdown', '.rst': 'reStructuredText', '.txt': 'Text', '.csv': 'CSV',
+}
+
+# Listings and digests taken this soon after an mtime are not reused: on
+# filesystems with coarse timestamps, a change in the same tick keeps the mtime
+RACY_WINDOW_NS = 2_000_000_000
+
+# Archives browsed as virtual directories with --archives
+ZIP_SUFFIXES = ('.zip', '.jar', '.war', '.ear', '.whl')
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+def default_socket_path() -> str:
+    """Server socket location: $TREECATT_SOCKET, else the user's runtime dir, else /tmp"""
+    if os.environ.get('TREECATT_SOCKET'):
+        return os.environ['TREECATT_SOCKET']
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'treecatt.sock')
+    return f"/tmp/treecatt-{os.getuid()}.sock"
@@ -1,33 +1,55 @@
 """
 TreeCatt features module
+
+Submodules are imported on first attribute access so that importing one
+feature (or the CLI) does not pay for the others.
 """
 
-from .git import GitStatusManager
-from .checksum import ChecksumManager
-from .file import (
-    is_binary_file,
-    get_permissions,
-    get_file_dates,
-    format_size,
-    matches_date_filter,
-    read_file_content
-)
-from .filter import (
-    should_ignore,
-    search_in_file,
-    sort_entries
-)
-
-__all__ = [
-    'GitStatusManager',
-    'ChecksumManager',
-    'is_binary_file',
-    'get_permissions',
-    'get_file_dates',
-    'format_size',
-    'matches_date_filter',
-    'read_file_content',
-    'should_ignore',
-    'search_in_file',
-    'sort_entries'
-]
\ No newline at end of file
+import importlib
+
+_EXPORTS = {
+    'GitStatusManager':         'git',
+    'ChecksumManager':          'checksum',
+    'TreeIndex':                'index',
+    'BundleWriter':             'bundle',
+    'NearDuplicateDetector':    'similarity',
+    'TreeComparer':             'compare',
+    'ListingCache':             'scancache',
+    'Checkpoint':               'checkpoint',
+    'LineStats':                'linestats',
+    'count_lines':              'linestats',
+    'is_binary_file':           'file',
+    'is_binary_chunk':          'file',
+    'is_regular_file':          'file',
+    'is_archive':               'file',
+    'file_kind':                'file',
+    'get_permissions':          'file',
+    'get_file_dates':           'file',
+    'format_size':              'file',
+    'matches_date_filter':      'file',
+    'read_file_content':        'file',
+    'load_file_bytes':          'file',
+    'read_file_bytes':          'file',
+    'read_text_bytes':          'file',
+    'should_ignore':            'filter',
+    'search_in_file':           'filter',
+    'content_matches':          'filter',
+    'sort_entries':             'filter',
+    'kind_is':                  'filter',
+    'entry_kind':               'filter',
+    'select_entries':           'filter',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
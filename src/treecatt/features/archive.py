@@ -0,0 +1,130 @@
+"""
+Zip and tar archives as virtual directories for TreeCatt
+"""
+
+import time
+import zlib
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from treecatt.constants import ZIP_SUFFIXES
+from treecatt.features.file import open_for_read
+
+# Everything a corrupt or truncated archive can raise while being read
+ARCHIVE_ERRORS          = (OSError, EOFError, ValueError, zlib.error, zipfile.BadZipFile, tarfile.TarError)
+try:
+    import lzma
+    ARCHIVE_ERRORS      += (lzma.LZMAError,)
+except ImportError:
+    pass
+
+
+class ArchiveMember(NamedTuple):
+    name: str
+    size: int
+    mtime: float
+
+
+# Virtual directory: child name -> sub-directory or member
+MemberTree = Dict[str, Union['MemberTree', ArchiveMember]]
+
+
+def _clean_name(name: str) -> str:
+    """Member name as a relative display path (members are never extracted)"""
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.')]
+    return '/'.join(parts)
+
+
+def list_members(path: Path) -> List[ArchiveMember]:
+    """Read the regular-file members of an archive from its headers, without reading data
+
+    Zip files only need their central directory; tar files are scanned
+    header by header (compressed tars are decompressed as a stream).
+    Corrupt archives raise one of ARCHIVE_ERRORS.
+    """
+    members = []
+    if path.name.lower().endswith(ZIP_SUFFIXES):
+        with open_for_read(path) as f, zipfile.ZipFile(f) as archive:
+            for info in archive.infolist():
+                name = _clean_name(info.filename)
+                if name and not info.is_dir():
+                    members.append(ArchiveMember(name, info.file_size, _zip_mtime(info)))
+        return members
+
+    with open_for_read(path) as f, tarfile.open(fileobj=f, mode='r|*') as archive:
+        for info in archive:
+            name = _clean_name(info.name)
+            if name and info.isfile():
+                members.append(ArchiveMember(name, info.size, float(info.mtime)))
+    return members
+
+
+def _zip_mtime(info: zipfile.ZipInfo) -> float:
+    try:
+        return time.mktime(info.date_time + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return 0.0
+
+
+def iter_member_streams(path: Path, max_size: int) -> Iterator[Tuple[ArchiveMember, Optional[IO[bytes]]]]:
+    """Yield (member, stream) in archive order; stream is None above max_size
+
+    Each stream must be consumed before advancing: tar members are read
+    from one sequential stream. Streams end at the member's declared size.
+    """
+    if path.name.lower().endswith(ZIP_SUFFIXES):
+        with open_for_read(path) as f, zipfile.ZipFile(f) as archive:
+            for info in archive.infolist():
+                name = _clean_name(info.filename)
+                if not name or info.is_dir():
+                    continue
+                member = ArchiveMember(name, info.file_size, _zip_mtime(info))
+                if info.file_size > max_size:
+                    yield member, None
+                    continue
+                with archive.open(info) as stream:
+                    yield member, stream
+        return
+
+    with open_for_read(path) as f, tarfile.open(fileobj=f, mode='r|*') as archive:
+        for info in archive:
+            name = _clean_name(info.name)
+            if not name or not info.isfile():
+                continue
+            member = ArchiveMember(name, info.size, float(info.mtime))
+            yield member, (archive.extractfile(info) if info.size <= max_size else None)
+
+
+def build_member_tree(members: List[ArchiveMember]) -> MemberTree:
+    """Nest members into virtual directories by path"""
+    tree: MemberTree = {}
+    for member in members:
+        node    = tree
+        parts   = member.name.split('/')
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if not isinstance(child, dict):
+                # A file and a directory with the same name: keep the file
+                break
+            node = child
+        else:
+            node.setdefault(parts[-1], member)
+    return tree
+
+
+def sort_member_tree(tree: MemberTree, sort_by: str) -> List[Tuple[str, Union[MemberTree, ArchiveMember]]]:
+    """Order virtual entries like sort_entries: directories first, then by sort_by"""
+    def key(item):
+        name, node  = item
+        is_dir      = isinstance(node, dict)
+        if sort_by == 'size':
+            return (not is_dir, 0 if is_dir else -node.size, name.lower())
+        if sort_by == 'date':
+            return (not is_dir, 0 if is_dir else -node.mtime, name.lower())
+        if sort_by == 'ext':
+            return (not is_dir, Path(name).suffix.lower(), name.lower())
+        return (not is_dir, name.lower())
+
+    return sorted(tree.items(), key=key)
@@ -0,0 +1,150 @@
+"""
+Bundle output (concatenated tree + raw file contents) for TreeCatt
+"""
+
+import os
+import json
+import stat
+from pathlib import Path
+from typing import BinaryIO, Iterable, List, Optional, Set, TextIO, Tuple
+
+from treecatt.features.checksum import ChecksumManager
+from treecatt.constants import BINARY_EXTENSIONS
+from treecatt.features.file import is_binary_chunk, open_for_read
+
+BUNDLE_MAGIC    = b"TreeCatt bundle v1\n"
+INDEX_SUFFIX    = ".idx"
+
+
+def splice_file(src: BinaryIO, dst: BinaryIO, count: int) -> int:
+    """Copy up to count bytes from src to dst, kernel-side when possible
+
+    Tries copy_file_range, then sendfile, and falls back to a userspace copy
+    for whatever is left (pipes, unsupported filesystems, other platforms).
+    """
+    src_fd      = src.fileno()
+    dst_fd      = dst.fileno()
+    copied      = 0
+    # Throttled readers (--gentle) account for kernel-side copies, in 1 MiB steps
+    consumed    = getattr(src, 'consumed', None)
+    step        = 1024 * 1024 if consumed is not None else count
+
+    for name in ('copy_file_range', 'sendfile'):
+        func = getattr(os, name, None)
+        if func is None:
+            continue
+        try:
+            while copied < count:
+                if name == 'copy_file_range':
+                    sent = func(src_fd, dst_fd, min(count - copied, step))
+                else:
+                    sent = func(dst_fd, src_fd, None, min(count - copied, step))
+                if sent == 0:
+                    return copied
+                copied += sent
+                if consumed is not None:
+                    consumed(sent)
+            return copied
+        except OSError:
+            # Unsupported here: fd positions reflect what was copied so far
+            continue
+
+    remaining = count - copied
+    while remaining > 0:
+        chunk = src.read(min(remaining, 1024 * 1024))
+        if not chunk:
+            break
+        dst.write(chunk)
+        remaining -= len(chunk)
+        copied += len(chunk)
+    return copied
+
+
+class BundleWriter:
+    """Writes a bundle file and its sidecar offset index
+
+    Every index entry has a checksum: the digest recorded by --checksums
+    when there is one, else a digest (SHA-256 by default) of the bytes just
+    copied, read back from the bundle while they are in the page cache.
+    """
+
+    def __init__(self,
+                 out_path: Path,
+                 max_file_size: float,
+                 checksum_manager: Optional[ChecksumManager] = None):
+        self.out_path           = Path(out_path)
+        self.index_path         = self.out_path.with_name(self.out_path.name + INDEX_SUFFIX)
+        self.max_file_size      = max_file_size
+        self.checksum_manager   = checksum_manager or ChecksumManager('sha256')
+        self.file_count         = 0
+        self.total_bytes        = 0
+
+    def write(self, root_path: Path, tree_lines: List[str], files: Iterable[Path]) -> int:
+        """Write header, tree and raw contents of text files; return file count
+
+        The bundle and index files themselves are skipped when they are
+        among `files` (written inside the scanned root).
+        """
+        with open(self.out_path, 'w+b') as out, open(self.index_path, 'w', encoding='utf-8') as index:
+            outputs = {(st.st_dev, st.st_ino) for st in (os.fstat(out.fileno()), os.fstat(index.fileno()))}
+            out.write(BUNDLE_MAGIC)
+            out.write(f"Root: {root_path}\n\n{root_path.name}/\n".encode('utf-8'))
+            for line in tree_lines:
+                out.write(line.encode('utf-8') + b"\n")
+
+            for path in files:
+                self._write_file(root_path, path, out, index, outputs)
+
+        return self.file_count
+
+    def _write_file(self, root_path: Path, path: Path, out: BinaryIO, index: TextIO,
+                    outputs: Set[Tuple[int, int]]) -> None:
+        """Append one file to the bundle and record it in the index"""
+        try:
+            st = path.stat()
+        except OSError:
+            return
+        size = st.st_size
+        if (st.st_dev, st.st_ino) in outputs:
+            return
+        if size > self.max_file_size or not stat.S_ISREG(st.st_mode) or path.suffix.lower() in BINARY_EXTENSIONS:
+            return
+
+        relative_path = str(path.relative_to(root_path))
+        try:
+            # One open per file: the binary check reads the head that is then written out
+            with open_for_read(path, buffering=0) as src:
+                head = src.read(min(size, 8192))
+                if is_binary_chunk(head):
+                    return
+                out.write(f"\nPath: {relative_path}\n".encode('utf-8'))
+                offset = out.tell()
+                out.write(head)
+                out.flush()
+                length = len(head) + splice_file(src, out, size - len(head))
+        except OSError:
+            return
+
+        checksum = self.checksum_manager.recorded_digest(path)
+        if checksum is None:
+            # The copied bytes are the last ones in the bundle: hash them back
+            out.seek(offset)
+            checksum = self.checksum_manager.digest_stream(out, length)
+        # Keep the buffered writer's position in sync with the fd
+        out.seek(offset + length)
+        index.write(json.dumps({
+            'path':     relative_path,
+            'offset':   offset,
+            'length':   length,
+            'checksum': checksum,
+        }) + "\n")
+
+        self.file_count     += 1
+        self.total_bytes    += length
+
+
+def read_bundle_entry(bundle_path: Path, offset: int, length: int) -> bytes:
+    """Read one file's raw contents back from a bundle"""
+    with open(bundle_path, 'rb') as f:
+        f.seek(offset)
+        return f.read(length)
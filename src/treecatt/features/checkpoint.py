@@ -0,0 +1,157 @@
+"""
+Resumable scans (--checkpoint / --resume) for TreeCatt
+"""
+
+import os
+import sys
+import json
+import threading
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, IO, List, Optional
+
+if TYPE_CHECKING:
+    from treecatt.features.checksum import ChecksumManager
+    from treecatt.features.scancache import ListingCache
+
+CHECKPOINT_VERSION              = 2
+DEFAULT_CHECKPOINT_INTERVAL     = 30.0
+DIGEST_RECORD                   = 'd'
+LISTING_RECORD                  = 'l'
+
+
+class Checkpoint:
+    """Scan progress journaled in the background, so an interrupted run can be resumed
+
+    Progress is what is expensive to redo: file digests, validated on resume
+    by size and mtime, and directory listings, validated by the directory's
+    mtime. The caches queue every new entry (see their `journal`), and a
+    background thread appends the queued entries to the checkpoint file and
+    fsyncs it every `interval` seconds, so each save only costs what was
+    added since the last one. The journal is compacted when it is loaded.
+
+    A resumed run walks the tree from the start again, answering completed
+    entries with a stat, so its output matches an uninterrupted run.
+    """
+
+    def __init__(self,
+                 path: str,
+                 roots: List[Path],
+                 checksum_manager: Optional['ChecksumManager'],
+                 listing_cache: 'ListingCache',
+                 interval: float = DEFAULT_CHECKPOINT_INTERVAL):
+        self.path                           = Path(path)
+        self.roots                          = [str(root) for root in roots]
+        self.checksum_manager               = checksum_manager
+        self.listing_cache                  = listing_cache
+        self.interval                       = interval
+        self.saves                          = 0
+        self.lock                           = threading.Lock()
+        self._file: Optional[IO[str]]       = None
+        self._stop                          = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _header(self) -> dict:
+        checksum_type = self.checksum_manager.checksum_type if self.checksum_manager else None
+        return {'version': CHECKPOINT_VERSION, 'roots': self.roots, 'checksum_type': checksum_type}
+
+    def load(self) -> bool:
+        """Restore a saved checkpoint; False when absent, unreadable or for other roots
+
+        A last record cut short by a crash is ignored.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                header  = json.loads(f.readline())
+                records = f.readlines()
+        except (OSError, ValueError):
+            return False
+
+        if not isinstance(header, dict) or header.get('version') != CHECKPOINT_VERSION:
+            return False
+        if header.get('roots') != self.roots:
+            return False
+
+        digests, directories = {}, {}
+        for line in records:
+            try:
+                kind, name, *entry = json.loads(line)
+            except ValueError:
+                continue
+            if kind == DIGEST_RECORD:
+                digests[name] = entry
+            elif kind == LISTING_RECORD:
+                directories[name] = entry
+
+        if self.checksum_manager is not None:
+            self.checksum_manager.restore_cache({'checksum_type': header.get('checksum_type'), 'entries': digests})
+        from treecatt.features.scancache import CACHE_VERSION
+        self.listing_cache.restore({'version': CACHE_VERSION, 'directories': directories})
+        return True
+
+    def start(self) -> None:
+        """Start journaling: write the compacted progress so far, then append in the background"""
+        digests     = self.checksum_manager.dump_cache()['entries'] if self.checksum_manager else {}
+        directories = self.listing_cache.dump()['directories']
+        tmp_path    = Path(f"{self.path}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self._header()) + "\n")
+            for path, entry in digests.items():
+                f.write(json.dumps([DIGEST_RECORD, path, *entry], separators=(',', ':')) + "\n")
+            for directory, entry in directories.items():
+                f.write(json.dumps([LISTING_RECORD, directory, *entry], separators=(',', ':')) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if self.checksum_manager is not None:
+            self.checksum_manager.journal = deque()
+        self.listing_cache.journal = deque()
+        self._thread = threading.Thread(target=self._run, name='treecatt-checkpoint', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.save()
+            except OSError as e:
+                # Keep scanning; queued entries are retried at the next interval
+                print(f"Warning: could not save checkpoint: {e}", file=sys.stderr)
+
+    def save(self) -> None:
+        """Append the entries queued since the last save, durably: they must survive a host crash"""
+        with self.lock:
+            if self._file is None:
+                return
+            for kind, journal in ((DIGEST_RECORD, getattr(self.checksum_manager, 'journal', None)),
+                                  (LISTING_RECORD, self.listing_cache.journal)):
+                while journal:
+                    name, *entry = journal.popleft()
+                    self._file.write(json.dumps([kind, name, *entry], separators=(',', ':')) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.saves += 1
+
+    def stop(self) -> None:
+        """Stop the background thread, save what is queued and stop journaling"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.save()
+        finally:
+            with self.lock:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+            if self.checksum_manager is not None:
+                self.checksum_manager.journal = None
+            self.listing_cache.journal = None
+
+    def remove(self) -> None:
+        """Delete the checkpoint once the run has completed"""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
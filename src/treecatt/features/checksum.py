@@ -2,47 +2,235 @@
 Checksum calculation and duplicate detection for TreeCatt
 """
 
+import os
+import json
+import stat
 import hashlib
+import itertools
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import BinaryIO, Deque, Dict, Iterable, List, Optional, Tuple
+
+from treecatt.constants import RACY_WINDOW_NS
+from treecatt.features.file import open_for_read
+from treecatt.features.index import TreeIndex
 
 class ChecksumManager:
-    """Manages file checksums and duplicate detection"""
+    """Manages file checksums and duplicate detection
+
+    The 'git' type computes git blob object IDs (SHA-1 of "blob <size>\\0"
+    plus the content), so digests of clean tracked files can be taken from
+    the git index instead of being read (see use_known_digests).
+
+    Recorded files are rows of a columnar TreeIndex (size and binary digest
+    columns), not Paths: duplicates are found at report time by sorting the
+    rows on their digest, and Paths are only built for the duplicates reported.
+    """
+
+    def __init__(self, checksum_type: str = 'md5', use_cache: bool = False):
+        hasher                                                  = self._new_hasher(checksum_type)
+        self.checksum_type                                      = checksum_type
+        self.digest_size                                        = hasher.digest_size if hasher else 0
+        # path -> (size, mtime_ns, digest); only kept when caching is enabled
+        self.cache: Optional[Dict[str, Tuple[int, int, str]]]   = {} if use_cache else None
+        # Digests already known to be current (e.g. git blob IDs of clean files)
+        self.known                                              = TreeIndex(Path(os.sep), self.digest_size)
+        self.known_hits                                         = 0
+        # Recorded files, one row each
+        self.records                                            = TreeIndex(Path(os.sep), self.digest_size)
+        self._root_prefixes: List[str]                          = []
+        self._lock                                              = threading.Lock()
+        # New cache entries (path, size, mtime_ns, digest), queued for a Checkpoint
+        self.journal: Optional[Deque[tuple]]                    = None
+
+    def _new_hasher(self, checksum_type: Optional[str] = None):
+        """Create a hasher for the configured checksum type"""
+        checksum_type = checksum_type or self.checksum_type
+        if checksum_type == 'md5':
+            hasher = hashlib.md5()
+        elif checksum_type in ('sha1', 'git'):
+            hasher = hashlib.sha1()
+        elif checksum_type == 'sha256':
+            hasher = hashlib.sha256()
+        else:
+            return None
+        return hasher
+
+    def digest(self, path: Path, st: Optional[os.stat_result] = None) -> Optional[str]:
+        """Compute the full hex digest of a file without recording it
+
+        `st` is the file's stat result when the caller already has it.
+
+        When caching is enabled, a digest whose size and mtime still match
+        the file is reused without reading it again. Digests of files
+        modified within RACY_WINDOW_NS are not cached: a write in the same
+        mtime tick would leave size and mtime unchanged.
+        """
+        if self._new_hasher() is None:
+            return None
+
+        try:
+            # Never open FIFOs or devices: reading them blocks or never ends
+            st = st or os.stat(path)
+            if not stat.S_ISREG(st.st_mode):
+                return None
+            known = self.known.find(path)
+            if known is not None:
+                self.known_hits += 1
+                return self.known.digest(known).hex()
+            if self.cache is not None:
+                cached = self.cache.get(str(path))
+                if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+                    return cached[2]
+
+            with open_for_read(path) as f:
+                checksum = self.digest_stream(f, st.st_size)
+        except OSError:
+            return None
+
+        if self.cache is not None and time.time_ns() - st.st_mtime_ns >= RACY_WINDOW_NS:
+            self.cache[str(path)] = (st.st_size, st.st_mtime_ns, checksum)
+            if self.journal is not None:
+                self.journal.append((str(path), st.st_size, st.st_mtime_ns, checksum))
+        return checksum
+
+    def digest_stream(self, f: BinaryIO, size: int) -> Optional[str]:
+        """Hex digest of a stream holding `size` bytes (e.g. an archive member)"""
+        hasher = self._new_hasher()
+        if hasher is None:
+            return None
+
+        if self.checksum_type == 'git':
+            hasher.update(b"blob %d\0" % size)
+        for chunk in iter(lambda: f.read(65536), b""):
+            hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def use_known_digests(self, root_path: Path, digests: Dict[str, str]) -> None:
+        """Trust digests of files under root_path (relative path -> digest) without reading them"""
+        for relative_path, digest in digests.items():
+            row = self.known.add_path(root_path / relative_path, 0)
+            self.known.set_digest(row, bytes.fromhex(digest))
+
+    def directory_digest(self, children: Iterable[Tuple[str, str, str]]) -> Optional[str]:
+        """Merkle digest of a directory from its (kind, name, digest) children"""
+        hasher = self._new_hasher()
+        if hasher is None:
+            return None
+
+        for kind, name, child_digest in sorted(children, key=lambda child: child[1]):
+            hasher.update(f"{kind}\0{name}\0{child_digest}\n".encode('utf-8', errors='surrogateescape'))
+        return hasher.hexdigest()
 
-    def __init__(self, checksum_type: str = 'md5'):
-        self.checksum_type                          = checksum_type
-        self.file_checksums: Dict[str, List[Path]]  = {}
+    def record(self, checksum: str, path: Path, size: Optional[int] = None) -> None:
+        """Record a file digest for duplicate detection (safe across scanning threads)
+
+        The size is stat'ed when not given (archive members must pass theirs).
+        """
+        if size is None:
+            size = path.stat().st_size
+        digest = bytes.fromhex(checksum)
+        with self._lock:
+            row = self.records.add_path(path, size)
+            self.records.set_digest(row, digest)
+
+    def recorded_digest(self, path: Path) -> Optional[str]:
+        """Hex digest recorded for a path, or None"""
+        with self._lock:
+            row = self.records.find(path)
+            return self.records.digest(row).hex() if row is not None else None
+
+    def order_by_roots(self, roots: List[Path]) -> None:
+        """Order duplicates by root, after roots were scanned concurrently
+
+        Rows of one root are recorded by one thread, so they are in tree
+        order: (root index, row) is the same whatever the thread timing.
+        """
+        self._root_prefixes = [os.path.join(str(root), "") for root in roots]
+
+    def _duplicate_rows(self) -> List[Tuple[bytes, List[int]]]:
+        """(digest, rows in recording order) for every digest recorded more than once
+
+        Rows are sorted on the digest column (stable, so recording order is
+        kept within a group); groups come in order of their first row.
+        """
+        records = self.records
+        size    = self.digest_size
+        with self._lock:
+            column = bytes(records.digests)
+        keys    = [column[start:start + size] for start in range(0, len(column), size)]
+        groups  = []
+        for digest, group in itertools.groupby(sorted(range(1, len(keys)), key=keys.__getitem__), key=keys.__getitem__):
+            # Directory rows created by add_path() have no digest
+            group = [row for row in group if not records.is_dir(row)]
+            if len(group) > 1:
+                groups.append((digest, group))
+        groups.sort(key=lambda item: item[1][0])
+        return groups
+
+    def load_cache(self, cache_path: Path) -> None:
+        """Load a persisted digest cache (silently ignored if absent or stale)"""
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.restore_cache(data)
+
+    def restore_cache(self, data: dict) -> None:
+        """Merge digests produced by dump_cache, if they are of the same checksum type"""
+        if self.cache is None:
+            self.cache = {}
+        if isinstance(data, dict) and data.get('checksum_type') == self.checksum_type:
+            self.cache.update({path: tuple(entry) for path, entry in data.get('entries', {}).items()})
+
+    def dump_cache(self) -> dict:
+        """The digest cache as JSON data (a snapshot: safe while scanning threads add digests)"""
+        return {'checksum_type': self.checksum_type, 'entries': dict(self.cache or {})}
+
+    def save_cache(self, cache_path: Path) -> None:
+        """Persist the digest cache atomically"""
+        if self.cache is None:
+            return
+        tmp_path = Path(f"{cache_path}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.dump_cache(), f, separators=(',', ':'))
+        os.replace(tmp_path, cache_path)
 
     def calculate(self, path: Path) -> Optional[str]:
         """Calculate the checksum of a file"""
-        try:
-            if self.checksum_type == 'md5':
-                hasher = hashlib.md5()
-            elif self.checksum_type == 'sha1':
-                hasher = hashlib.sha1()
-            elif self.checksum_type == 'sha256':
-                hasher = hashlib.sha256()
-            else:
-                return ""
-
-            with open(path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hasher.update(chunk)
-
-            checksum = hasher.hexdigest()
-
-            if checksum in self.file_checksums:
-                self.file_checksums[checksum].append(path)
-            else:
-                self.file_checksums[checksum] = [path]
-
-            return checksum[:8]
-        except:
+        checksum = self.digest(path)
+        if not checksum:
             return ""
 
+        self.record(checksum, path)
+        return checksum[:8]
+
     def get_duplicates(self) -> Dict[str, List[Path]]:
         """Returnrs file with duplicate checknums"""
-        return {k: v for k, v in self.file_checksums.items() if len(v) > 1}
+        return {digest.hex(): [path for path, _ in files] for digest, files in self._duplicate_files()}
+
+    def _duplicate_files(self) -> List[Tuple[bytes, List[Tuple[Path, int]]]]:
+        """(digest, [(path, size)]) per duplicate group, ordered by root when roots were given
+
+        Files are sorted by (root index, row) and groups by the position of
+        their first file, so concurrent scans report the same order.
+        """
+        prefixes    = self._root_prefixes
+        groups      = []
+        for digest, rows in self._duplicate_rows():
+            files = []
+            for row in rows:
+                path        = self.records.path(row)
+                root_index  = next((i for i, prefix in enumerate(prefixes) if str(path).startswith(prefix)),
+                                   len(prefixes))
+                files.append(((root_index, row), path, self.records.sizes[row]))
+            files.sort(key=lambda item: item[0])
+            groups.append((files[0][0], digest, [(path, size) for _, path, size in files]))
+
+        groups.sort(key=lambda group: group[0])
+        return [(digest, files) for _, digest, files in groups]
 
     def format_size(self, size: float) -> str:
         """Format size in readable units"""
@@ -54,16 +242,16 @@ class ChecksumManager:
 
     def print_duplicates(self, root_path: Path):
         """Print duplicate files report"""
-        duplicates = self.get_duplicates()
+        duplicates = list(self._duplicate_files())
 
         if not duplicates:
             return
 
         print("\nDuplicate files found:")
         print("-" * 70)
-        for checksum, files in duplicates.items():
-            print(f"\nChecksum: {checksum}")
-            total_wasted = sum(f.stat().st_size for f in files[1:])
+        for digest, files in duplicates:
+            print(f"\nChecksum: {digest.hex()}")
+            total_wasted = sum(size for _, size in files[1:])
             print(f"Wasted space: {self.format_size(total_wasted)}")
-            for f in files:
-                print(f"  - {f.relative_to(root_path)} ({self.format_size(f.stat().st_size)})")
\ No newline at end of file
+            for f, size in files:
+                print(f"  - {f.relative_to(root_path)} ({self.format_size(size)})")
\ No newline at end of file
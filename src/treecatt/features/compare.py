@@ -0,0 +1,144 @@
+"""
+Two-tree comparison for TreeCatt
+"""
+
+import os
+import stat
+from pathlib import Path
+from typing import Callable, Dict, List, Set, Tuple
+
+from treecatt.features.checksum import ChecksumManager
+from treecatt.features.file import file_kind
+
+ADDED           = '+'
+REMOVED         = '-'
+MODIFIED        = 'M'
+TYPE_CHANGED    = 'T'
+
+
+class TreeComparer:
+    """Walks two trees side by side and reports their differences
+
+    Files are only hashed when their sizes match, and digests go through the
+    ChecksumManager cache: with a persisted cache, files whose size and
+    mtime are unchanged since the last run are compared without being read.
+    """
+
+    def __init__(self,
+                 checksum_manager: ChecksumManager,
+                 list_dir: Callable[[Path], List[Path]],
+                 follow_symlinks: bool = False):
+        self.checksum_manager                       = checksum_manager
+        self.list_dir                               = list_dir
+        self.follow_symlinks                        = follow_symlinks
+        self._visited: Set[Tuple[int, int]]         = set()
+        self.differences: List[Tuple[str, str]]     = []
+        self.compared_files                         = 0
+
+    def compare(self, left: Path, right: Path) -> List[Tuple[str, str]]:
+        """Compare two directories; returns (code, relative path) pairs"""
+        self.differences    = []
+        self.compared_files = 0
+        self._visited       = set()
+        self._compare_dirs(left, right, "")
+        return self.differences
+
+    def _report(self, code: str, relative_path: str, is_dir: bool) -> None:
+        self.differences.append((code, relative_path + ("/" if is_dir else "")))
+
+    def _children(self, directory: Path) -> Dict[str, Path]:
+        try:
+            return {entry.name: entry for entry in self.list_dir(directory)}
+        except PermissionError:
+            return {}
+
+    def _kind(self, entry: Path) -> str:
+        """'l' for a symlink that is not followed, 'd', 'f', or 's' for FIFOs, sockets and devices"""
+        if not self.follow_symlinks and entry.is_symlink():
+            return 'l'
+        try:
+            mode = entry.stat().st_mode
+        except OSError:
+            return 'f'
+        if stat.S_ISDIR(mode):
+            return 'd'
+        return 's' if file_kind(mode) else 'f'
+
+    def _compare_dirs(self, left: Path, right: Path, relative: str) -> None:
+        """Compare the children of two directories, recursing into common subdirectories"""
+        if self.follow_symlinks:
+            try:
+                st = left.stat()
+            except OSError:
+                return
+            if (st.st_dev, st.st_ino) in self._visited:
+                return
+            self._visited.add((st.st_dev, st.st_ino))
+
+        left_entries    = self._children(left)
+        right_entries   = self._children(right)
+
+        for name in sorted(left_entries.keys() | right_entries.keys()):
+            relative_path   = os.path.join(relative, name)
+            left_entry      = left_entries.get(name)
+            right_entry     = right_entries.get(name)
+
+            if right_entry is None:
+                self._report(REMOVED, relative_path, self._kind(left_entry) == 'd')
+                continue
+            if left_entry is None:
+                self._report(ADDED, relative_path, self._kind(right_entry) == 'd')
+                continue
+
+            left_kind, right_kind = self._kind(left_entry), self._kind(right_entry)
+            if left_kind != right_kind:
+                self._report(TYPE_CHANGED, relative_path, False)
+            elif left_kind == 'd':
+                self._compare_dirs(left_entry, right_entry, relative_path)
+            elif left_kind == 'l':
+                if os.readlink(left_entry) != os.readlink(right_entry):
+                    self._report(MODIFIED, relative_path, False)
+            elif left_kind == 's':
+                if not self._same_special_file(left_entry, right_entry):
+                    self._report(MODIFIED, relative_path, False)
+            elif not self._same_file(left_entry, right_entry):
+                self._report(MODIFIED, relative_path, False)
+
+    @staticmethod
+    def _same_special_file(left: Path, right: Path) -> bool:
+        """Compare FIFOs, sockets and devices by type (and device number), never by content"""
+        try:
+            left_st, right_st = left.stat(), right.stat()
+        except OSError:
+            return False
+        if file_kind(left_st.st_mode) != file_kind(right_st.st_mode):
+            return False
+        is_device = stat.S_ISCHR(left_st.st_mode) or stat.S_ISBLK(left_st.st_mode)
+        return not is_device or left_st.st_rdev == right_st.st_rdev
+
+    def _same_file(self, left: Path, right: Path) -> bool:
+        """Compare a file pair, skipping the read when sizes already differ"""
+        self.compared_files += 1
+        try:
+            if left.stat().st_size != right.stat().st_size:
+                return False
+        except OSError:
+            return False
+
+        left_digest = self.checksum_manager.digest(left)
+        return left_digest is not None and left_digest == self.checksum_manager.digest(right)
+
+    def print_differences(self, left: Path, right: Path) -> None:
+        """Print the comparison report"""
+        print(f"\nComparing: {left}")
+        print(f"     with: {right}\n")
+
+        for code, relative_path in self.differences:
+            print(f"  {code}  {relative_path}")
+
+        print(f"\nStatistics:")
+        print(f"  - {self.compared_files} file pairs compared")
+        if self.differences:
+            print(f"  - {len(self.differences)} differences")
+        else:
+            print("  - Trees are identical")
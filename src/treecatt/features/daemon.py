@@ -0,0 +1,239 @@
+"""
+Long-lived server mode for TreeCatt (warm caches over a Unix socket)
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import struct
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from treecatt.features.git import GitStatusManager
+from treecatt.features.scancache import ListingCache
+
+FRAME_HEADER    = struct.Struct('>cI')
+STDOUT_FRAME    = b'o'
+STDERR_FRAME    = b'e'
+EXIT_FRAME      = b'x'
+DEFAULT_GIT_TTL = 2.0
+
+
+class ServerLost(ConnectionError):
+    """The server went away before the exit frame"""
+
+    def __init__(self, message: str, output_written: bool):
+        super().__init__(message)
+        self.output_written = output_written
+
+
+class WarmState:
+    """In-memory state shared by every request the server answers
+
+    - git status per root, refreshed when .git/index or HEAD change, and
+      at most every `git_ttl` seconds for working-tree-only edits
+    - file digests per checksum type, validated by size and mtime
+    - directory listings, validated by the directory's mtime
+    """
+
+    def __init__(self, git_ttl: float = DEFAULT_GIT_TTL):
+        self.git_ttl                                                    = git_ttl
+        self.listings                                                   = ListingCache()
+        self.digest_caches: Dict[str, dict]                             = {}
+        self._git: Dict[Path, Tuple[GitStatusManager, tuple, float]]    = {}
+
+    def _git_signature(self, root_path: Path) -> tuple:
+        """mtimes of the repository index and HEAD governing root_path"""
+        for parent in (root_path, *root_path.parents):
+            git_dir = parent / '.git'
+            if git_dir.is_dir():
+                signature = []
+                for name in ('index', 'HEAD'):
+                    try:
+                        signature.append((git_dir / name).stat().st_mtime_ns)
+                    except OSError:
+                        signature.append(None)
+                return tuple(signature)
+            if git_dir.exists():
+                # Worktrees and submodules: no cheap signature, rely on the TTL
+                return ()
+        return ()
+
+    def git_manager(self, root_path: Path) -> GitStatusManager:
+        """Return a fresh-enough GitStatusManager for root_path"""
+        signature   = self._git_signature(root_path)
+        cached      = self._git.get(root_path)
+        now         = time.monotonic()
+
+        if cached and cached[1] == signature and now - cached[2] < self.git_ttl:
+            return cached[0]
+
+        manager                 = GitStatusManager(root_path)
+        self._git[root_path]    = (manager, signature, now)
+        return manager
+
+    def digest_cache(self, checksum_type: str) -> dict:
+        """Return the shared digest cache for a checksum type"""
+        return self.digest_caches.setdefault(checksum_type, {})
+
+
+class _FrameWriter(io.RawIOBase):
+    """Raw stream sending each write as one frame on the socket"""
+
+    def __init__(self, conn: socket.socket, kind: bytes):
+        self.conn = conn
+        self.kind = kind
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        if data:
+            self.conn.sendall(FRAME_HEADER.pack(self.kind, len(data)) + data)
+        return len(data)
+
+
+def _text_stream(conn: socket.socket, kind: bytes) -> io.TextIOWrapper:
+    return io.TextIOWrapper(io.BufferedWriter(_FrameWriter(conn, kind), 1024 * 1024),
+                            encoding='utf-8', errors='surrogateescape', write_through=False)
+
+
+def _recv_exact(conn: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data += chunk
+    return data
+
+
+def handle_request(conn: socket.socket, run: Callable[[List[str]], int]) -> None:
+    """Answer one client request: run the CLI with output sent back as frames"""
+    request = json.loads(conn.makefile('rb').readline())
+    stdout  = _text_stream(conn, STDOUT_FRAME)
+    stderr  = _text_stream(conn, STDERR_FRAME)
+    code    = 1
+    cwd     = os.getcwd()
+
+    try:
+        os.chdir(request['cwd'])
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                code = run(request['argv'])
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                if isinstance(e.code, str):
+                    print(e.code, file=sys.stderr)
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    finally:
+        os.chdir(cwd)
+        stdout.flush()
+        stderr.flush()
+        conn.sendall(FRAME_HEADER.pack(EXIT_FRAME, 4) + struct.pack('>i', code or 0))
+
+
+def run_client(argv: List[str], socket_path: str) -> Optional[int]:
+    """Forward a CLI invocation to a running server
+
+    Returns the exit code, or None when no usable server is listening (the
+    caller then runs locally). A server dying mid-request also falls back to
+    the local run if it had not sent any output yet, and fails otherwise.
+    """
+    try:
+        if os.stat(socket_path).st_uid != os.getuid():
+            return None
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(socket_path)
+    except OSError:
+        return None
+
+    with conn:
+        try:
+            conn.sendall(json.dumps({'argv': argv, 'cwd': os.getcwd()}).encode() + b"\n")
+            return read_response(conn, sys.stdout.buffer, sys.stderr.buffer)
+        except ServerLost as e:
+            if e.output_written:
+                print(f"Error: the TreeCatt server stopped mid-response ({e})", file=sys.stderr)
+                return 1
+            print(f"Warning: the TreeCatt server stopped ({e}), running locally", file=sys.stderr)
+            return None
+        except OSError:
+            return None
+
+
+def read_response(conn: socket.socket, out: BinaryIO, err: BinaryIO) -> int:
+    """Copy response frames to out/err until the exit frame; returns the exit code
+
+    Raises ServerLost if the connection ends or breaks before the exit frame.
+    """
+    written = False
+    try:
+        while True:
+            kind, size  = FRAME_HEADER.unpack(_recv_exact(conn, FRAME_HEADER.size))
+            payload     = _recv_exact(conn, size)
+            if kind == EXIT_FRAME:
+                out.flush()
+                err.flush()
+                return struct.unpack('>i', payload)[0]
+            (out if kind == STDOUT_FRAME else err).write(payload)
+            written = written or bool(payload)
+    except (OSError, struct.error) as e:
+        raise ServerLost(str(e) or type(e).__name__, written) from e
+
+
+def _stop_serving(*_) -> None:
+    """SIGTERM handler: unwinds like ^C (not caught by per-request handling)"""
+    raise KeyboardInterrupt
+
+
+def serve(socket_path: str, run: Callable[[List[str]], int]) -> int:
+    """Serve CLI requests on a Unix socket until interrupted
+
+    Requests are handled one at a time: each one changes directory and
+    redirects the process-wide stdout/stderr.
+    """
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            print(f"Error: a TreeCatt server is already listening on {socket_path}", file=sys.stderr)
+            return 1
+        except OSError:
+            os.unlink(socket_path)
+        finally:
+            probe.close()
+
+    server      = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask   = os.umask(0o177)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    server.listen(16)
+    print(f"TreeCatt server listening on {socket_path}", file=sys.stderr)
+
+    signal.signal(signal.SIGTERM, _stop_serving)
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                try:
+                    handle_request(conn, run)
+                except (OSError, ValueError, KeyError):
+                    pass
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
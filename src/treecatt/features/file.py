@@ -2,42 +2,144 @@
 File utility functions for TreeCatt
 """
 
-from calendar import week
+import os
+import stat
 from pathlib import Path
-from datetime import datetime, timezone
-from typing import Optional, Union
-from treecatt.constants import BINARY_EXTENSIONS
+from typing import TYPE_CHECKING, BinaryIO, Optional, Union
+from treecatt.constants import BINARY_EXTENSIONS, TAR_SUFFIXES, ZIP_SUFFIXES
 
-def is_binary_file(path: Path) -> Optional[bool]:
-    """Determine if a file is binary(like cat does)"""
+if TYPE_CHECKING:
+    from treecatt.features.throttle import IOThrottle
+
+TEXT_CHARS = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7f})
+SPECIAL_FILE_KINDS = (
+    (stat.S_ISFIFO, 'fifo'),
+    (stat.S_ISSOCK, 'socket'),
+    (stat.S_ISCHR,  'char device'),
+    (stat.S_ISBLK,  'block device'),
+)
 
-    if path.suffix.lower() in BINARY_EXTENSIONS:
-        return True
 
+def file_kind(mode: int) -> Optional[str]:
+    """Name of a special file type (FIFO, socket, device); None for regular files"""
+    for check, kind in SPECIAL_FILE_KINDS:
+        if check(mode):
+            return kind
+    return None
+
+
+def is_regular_file(path: Path) -> bool:
+    """Check if path is a regular file, safe to open (opening a FIFO blocks)"""
     try:
-        with open(path, 'rb') as f:
-            chunk = f.read(8192)
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+# Set by --gentle: every file read goes through open_for_read
+_io_throttle: Optional['IOThrottle'] = None
+
+
+def set_io_throttle(throttle: Optional['IOThrottle']) -> None:
+    """Route all file reads through an IOThrottle (None to disable)"""
+    global _io_throttle
+    _io_throttle = throttle
+
+
+class _ThrottledReader:
+    """Binary file wrapper accounting reads to an IOThrottle
+
+    Only bytes not already read (and still cached) earlier in the run are
+    accounted. Closing it hands the file's pages over to the throttle,
+    which drops them from the cache once the file is no longer needed.
+    """
+
+    def __init__(self, f: BinaryIO, throttle: 'IOThrottle'):
+        st              = os.fstat(f.fileno())
+        self.f          = f
+        self.throttle   = throttle
+        self.key        = (st.st_dev, st.st_ino)
+        self.position   = 0
+        self.high_water = 0
+        self.cached     = throttle.opened(self.key)
+
+    def _account(self, start: int, size: int) -> None:
+        end             = start + size
+        self.position   = end
+        self.high_water = max(self.high_water, end)
+        self.throttle.read(max(0, end - max(start, self.cached)))
 
-            if not chunk:
-                return False
+    def read(self, size: int = -1) -> bytes:
+        start   = self.f.tell() if self.f.seekable() else self.position
+        data    = self.f.read(size)
+        self._account(start, len(data))
+        return data
 
-            if b'\x00' in chunk:
-                return True
+    def consumed(self, size: int) -> None:
+        """Account for bytes copied from the fd without read() (kernel-side copies)"""
+        self._account(self.position, size)
 
-            text_chars = bytearray({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7f})
-            no_text    = chunk.translate(None, text_chars)
+    def fileno(self) -> int:
+        return self.f.fileno()
 
-            if len(no_text) / len(chunk) > 0.3:
-                return True
+    def __getattr__(self, name: str):
+        # seek/tell and the rest, for readers such as zipfile
+        return getattr(self.f, name)
 
-            return False
+    def close(self) -> None:
+        if not self.f.closed:
+            self.throttle.closed(self.key, self.f.name, self.f.fileno(), self.high_water)
+            self.f.close()
+
+    def __enter__(self) -> '_ThrottledReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_for_read(path: Union[Path, str], buffering: int = -1) -> BinaryIO:
+    """Open a file for binary reading, throttled in --gentle mode"""
+    f = open(path, 'rb', buffering=buffering)
+    if _io_throttle is None:
+        return f
+    return _ThrottledReader(f, _io_throttle)
+
+
+def is_binary_chunk(chunk: bytes) -> bool:
+    """Determine if a leading chunk of file data looks binary"""
+    if not chunk:
+        return False
+
+    if b'\x00' in chunk:
+        return True
+
+    no_text = chunk.translate(None, TEXT_CHARS)
+    return len(no_text) / len(chunk) > 0.3
+
+
+def is_archive(path: Path) -> bool:
+    """Check if a file name is a supported archive (zip family or tar, optionally compressed)"""
+    name = path.name.lower()
+    return name.endswith(ZIP_SUFFIXES) or name.endswith(TAR_SUFFIXES)
+
+
+def is_binary_file(path: Path) -> Optional[bool]:
+    """Determine if a file is binary(like cat does)"""
+
+    if path.suffix.lower() in BINARY_EXTENSIONS or not is_regular_file(path):
+        return True
+
+    try:
+        with open_for_read(path) as f:
+            return is_binary_chunk(f.read(8192))
     except:
         return True
 
-def get_permissions(path: Path) -> Optional[str]:
-    """Returns the Unix permissions of the file"""
+def get_permissions(path: Path, stat_info: Optional[os.stat_result] = None) -> Optional[str]:
+    """Returns the Unix permissions of the file (from stat_info when already known)"""
     try:
-        stat_info   = path.stat()
+        stat_info   = stat_info or path.stat()
         mode        = stat_info.st_mode
 
         perms = ''
@@ -68,6 +170,8 @@ def matches_date_filter(path: Path, filter_spec: Optional[str]) -> bool:
     if not filter_spec:
         return True
 
+    from datetime import datetime
+
     try:
         stat_info   = path.stat()
         mtime       = datetime.fromtimestamp(stat_info.st_mtime)
@@ -96,8 +200,11 @@ def read_file_content(
     """Read file content (like cat does)"""
 
     try:
-        size = file_path.stat().st_size
+        st = file_path.stat()
+        if not stat.S_ISREG(st.st_mode):
+            return f"[Not a regular file: {file_kind(st.st_mode)}]"
 
+        size = st.st_size
         if size > max_size:
             return f"[File to large: {format_size(size)}]"
 
@@ -139,10 +246,71 @@ def read_file_content(
     except Exception as e:
         return f"[Read error: {str(e)}]"
 
-def get_file_dates(path: Union[Path, str]) -> str:
+def read_text_bytes(file_path: Path, max_size: float) -> Optional[bytes]:
+    """Read a text file as bytes; None if it is too large, binary or unreadable"""
+    try:
+        if file_path.suffix.lower() in BINARY_EXTENSIONS:
+            return None
+        st = file_path.stat()
+        if not stat.S_ISREG(st.st_mode) or st.st_size > max_size:
+            return None
+        with open_for_read(file_path) as f:
+            content = f.read()
+    except OSError:
+        return None
+
+    return None if is_binary_chunk(content[:8192]) else content
+
+def render_bytes(content: bytes, show_line_numbers: bool = False) -> bytes:
+    """Display form of file data: '[Binary file]', or the bytes with optional line numbers"""
+    if is_binary_chunk(content[:8192]):
+        return b"[Binary file]"
+
+    if show_line_numbers:
+        lines = content.split(b'\n')
+        return b'\n'.join([b"%4d | %b" % (i, line) for i, line in enumerate(lines, 1)])
+
+    return content
+
+def load_file_bytes(file_path: Path, max_size: float) -> Union[bytes, str]:
+    """Read a file's raw bytes, or return the placeholder shown instead (as str)"""
+
+    try:
+        st = file_path.stat()
+        if not stat.S_ISREG(st.st_mode):
+            return f"[Not a regular file: {file_kind(st.st_mode)}]"
+
+        size = st.st_size
+        if size > max_size:
+            return f"[File to large: {format_size(size)}]"
+
+        if file_path.suffix.lower() in BINARY_EXTENSIONS:
+            return "[Binary file]"
+
+        with open_for_read(file_path) as f:
+            return f.read()
+
+    except PermissionError:
+        return "[Permission denied]"
+    except Exception as e:
+        return f"[Read error: {str(e)}]"
+
+def read_file_bytes(
+    file_path: Path,
+    max_size: float,
+    show_line_numbers: bool = False
+    ) -> bytes:
+    """Read file content as raw bytes (byte-exact cat), numbering lines on bytes"""
+    content = load_file_bytes(file_path, max_size)
+    if isinstance(content, str):
+        return content.encode()
+    return render_bytes(content, show_line_numbers)
+
+def get_file_dates(path: Union[Path, str], stat_info: Optional[os.stat_result] = None) -> str:
+    from datetime import datetime, timezone
+
     try:
-        p           = Path(path)
-        stat_info   = p.stat()
+        stat_info   = stat_info or Path(path).stat()
         mtime       = datetime.fromtimestamp(stat_info.st_mtime, tz=timezone.utc)
         return mtime.strftime('%Y-%m-%d %H:%M')
     except (OSError, ValueError, TypeError):
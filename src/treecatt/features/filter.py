@@ -2,10 +2,12 @@
 Filter and search utilities for TreeCatt
 """
 
+import os
+import heapq
 import fnmatch
 from pathlib import Path
-from typing import Set, List, Optional
-from treecatt.features.file import is_binary_file
+from typing import Callable, Set, List, Optional
+from treecatt.features.file import is_binary_file, open_for_read
 
 
 def should_ignore(path: Path, ignore_patterns: Set[str], sensitive_patterns: Set[str],
@@ -42,20 +44,101 @@ def search_in_file(path: Path, search_pattern: str) -> bool:
         if is_binary_file(path):
             return False
 
-        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        with open_for_read(path) as f:
             content = f.read()
-            return search_pattern.lower() in content.lower()
+
+        return content_matches(content, search_pattern)
     except:
         return False
 
 
-def sort_entries(entries: List[Path], sort_by: str) -> List[Path]:
-    """Sort entries by specified criteria"""
+def content_matches(content: bytes, search_pattern: str) -> bool:
+    """Case-insensitive search in raw file data"""
+    # ASCII patterns match on bytes directly; only decode when needed
+    if search_pattern.isascii():
+        return search_pattern.lower().encode() in content.lower()
+    return search_pattern.lower() in content.decode('utf-8', errors='ignore').lower()
+
+
+def _mtime(path: Path) -> float:
+    """Modification time, falling back to the link itself for dangling symlinks"""
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        try:
+            return path.lstat().st_mtime
+        except OSError:
+            return 0.0
+
+
+def entry_kind(entry: os.DirEntry) -> str:
+    """'l' symlink, 'd' directory, 'f' regular file, 'o' other (from d_type, no stat)"""
+    try:
+        if entry.is_symlink():
+            return 'l'
+        if entry.is_dir(follow_symlinks=False):
+            return 'd'
+        if entry.is_file(follow_symlinks=False):
+            return 'f'
+    except OSError:
+        pass
+    return 'o'
+
+
+def kind_is(path: Path, expected: str, kind: Optional[Callable[[Path], Optional[str]]]) -> bool:
+    """Check an entry type ('d' or 'f') from a kind lookup, stat'ing only unknown entries and links"""
+    cached = kind(path) if kind is not None else None
+    if cached is None or cached == 'l':
+        return path.is_dir() if expected == 'd' else path.is_file()
+    return cached == expected
+
+
+def sort_entries(entries: List[Path], sort_by: str,
+                 kind: Optional[Callable[[Path], Optional[str]]] = None) -> List[Path]:
+    """Sort entries by specified criteria
+
+    `kind` (e.g. ListingCache.kind) gives entry types without a stat.
+    """
+    def is_dir(x):
+        return kind_is(x, 'd', kind)
+
+    if sort_by == 'size':
+        return sorted(entries, key=lambda x: (not is_dir(x), -x.stat().st_size if kind_is(x, 'f', kind) else 0,
+                                              x.name.lower()))
+    elif sort_by == 'date':
+        return sorted(entries, key=lambda x: (not is_dir(x), -_mtime(x), x.name.lower()))
+    elif sort_by == 'ext':
+        return sorted(entries, key=lambda x: (not is_dir(x), x.suffix.lower(), x.name.lower()))
+    else:  # name (default)
+        return sorted(entries, key=lambda x: (not is_dir(x), x.name.lower()))
+
+
+def _entry_stat(entry: os.DirEntry) -> Optional[os.stat_result]:
+    try:
+        return entry.stat()
+    except OSError:
+        return None
+
+
+def select_entries(entries: List[os.DirEntry], sort_by: str, limit: int) -> List[os.DirEntry]:
+    """Pick the first `limit` scandir entries in sort_entries order, without a full sort
+
+    Name and extension orders only use d_type from the directory listing, so
+    no entry is stat'ed; size and date orders stat every candidate.
+    """
     if sort_by == 'size':
-        return sorted(entries, key=lambda x: (not x.is_dir(), -x.stat().st_size if x.is_file() else 0, x.name.lower()))
+        def key(e):
+            st = _entry_stat(e) if e.is_file() else None
+            return (not e.is_dir(), -st.st_size if st else 0, e.name.lower())
     elif sort_by == 'date':
-        return sorted(entries, key=lambda x: (not x.is_dir(), -x.stat().st_mtime, x.name.lower()))
+        def key(e):
+            st = _entry_stat(e)
+            return (not e.is_dir(), -st.st_mtime if st else 0.0, e.name.lower())
     elif sort_by == 'ext':
-        return sorted(entries, key=lambda x: (not x.is_dir(), x.suffix.lower(), x.name.lower()))
+        def key(e):
+            return (not e.is_dir(), os.path.splitext(e.name)[1].lower(), e.name.lower())
     else:  # name (default)
-        return sorted(entries, key=lambda x: (not x.is_dir(), x.name.lower()))
\ No newline at end of file
+        def key(e):
+            return (not e.is_dir(), e.name.lower())
+
+    return heapq.nsmallest(limit, entries, key=key)
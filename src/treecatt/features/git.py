@@ -2,17 +2,27 @@
 Git integration features for TreeCatt
 """
 
+import os
+import json
+import time
 import subprocess
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+COMMIT_MARKER       = "\x1e"
+FIELD_SEPARATOR     = "\x1f"
+LAST_COMMIT_CACHE   = "treecatt-last-commit.json"
 
 class GitStatusManager:
     """Manages Git status information for files"""
 
-    def __init__(self, root_path: Path):
-        self.root_path                      = root_path
-        self.status_cache: Dict[str, str]   = {}
-        self._cache_git_status()
+    def __init__(self, root_path: Path, load_status: bool = True):
+        self.root_path                                          = root_path
+        self.status_cache: Dict[str, str]                       = {}
+        # path relative to root_path -> (hash, unix time, author)
+        self.last_commits: Dict[str, Tuple[str, int, str]]      = {}
+        if load_status:
+            self._cache_git_status()
 
 
     def _cache_git_status(self):
@@ -55,3 +65,178 @@ class GitStatusManager:
             return status_map.get(status.strip(), "")
         except ValueError:
             return ""
+
+    def _git_output(self, *args: str) -> Optional[bytes]:
+        """Run a git command in root_path; None if git is missing or fails"""
+        try:
+            result = subprocess.run(
+                ['git', *args],
+                cwd                     = self.root_path,
+                capture_output          = True,
+                timeout                 = 30
+            )
+        except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
+            return None
+        return result.stdout if result.returncode == 0 else None
+
+    def _iter_log(self) -> Iterator[Tuple[Tuple[str, int, str], str]]:
+        """Stream (commit, path) pairs from one `git log --name-only -z`, newest first
+
+        Paths are relative to root_path (--relative). Closing the generator
+        terminates git, so callers can stop as soon as they have what they need.
+        """
+        try:
+            process = subprocess.Popen(
+                ['git', 'log', f'--format={COMMIT_MARKER}%H{FIELD_SEPARATOR}%at{FIELD_SEPARATOR}%an',
+                 '--name-only', '-z', '--relative', '--no-renames', '--', '.'],
+                cwd                     = self.root_path,
+                stdout                  = subprocess.PIPE,
+                stderr                  = subprocess.DEVNULL
+            )
+        except (FileNotFoundError, OSError):
+            return
+
+        commit  = None
+        pending = b""
+        try:
+            for chunk in iter(lambda: process.stdout.read(65536), b""):
+                tokens  = (pending + chunk).split(b"\0")
+                pending = tokens.pop()
+                for token in tokens:
+                    field = os.fsdecode(token.lstrip(b"\n"))
+                    if field.startswith(COMMIT_MARKER):
+                        commit_hash, timestamp, author = field[1:].split(FIELD_SEPARATOR, 2)
+                        commit = (commit_hash, int(timestamp), author)
+                    elif field and commit:
+                        yield commit, field
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.terminate()
+            process.wait()
+
+    def _repository_info(self) -> Optional[Tuple[Path, str, str]]:
+        """Return (git dir, prefix of root_path in the repository, HEAD hash)"""
+        output = self._git_output('rev-parse', '--absolute-git-dir', '--show-prefix', 'HEAD')
+        if output is None:
+            return None
+        git_dir, prefix, head = os.fsdecode(output).split("\n")[:3]
+        return Path(git_dir), prefix, head
+
+    def clean_blob_ids(self) -> Dict[str, str]:
+        """Return {path relative to root_path: blob ID} for tracked files with no worktree changes
+
+        Object IDs come from the index (`git ls-files -s -z`); files that
+        `git diff` reports as changed against the index are left out, as are
+        symlinks, submodules and unmerged entries. Files with clean/smudge
+        filters (eol conversion, LFS) get the ID of their normalized content.
+        """
+        staged = self._git_output('ls-files', '-s', '-z')
+        if staged is None:
+            return {}
+        dirty = self._git_output('diff', '--name-only', '-z', '--relative')
+        if dirty is None:
+            return {}
+        dirty_paths = {os.fsdecode(p) for p in dirty.split(b"\0") if p}
+
+        blob_ids: Dict[str, str] = {}
+        for record in staged.split(b"\0"):
+            if not record:
+                continue
+            info, _, path    = record.partition(b"\t")
+            mode, oid, stage = info.split(b" ")
+            if stage != b"0" or mode not in (b"100644", b"100755"):
+                continue
+            path = os.fsdecode(path)
+            if path not in dirty_paths:
+                blob_ids[path] = oid.decode('ascii')
+        return blob_ids
+
+    def changed_since(self, ref: str) -> Optional[Set[str]]:
+        """Paths under root_path changed since a revision, relative to root_path
+
+        One `git diff --name-only REF` covers committed, staged and unstaged
+        changes; untracked files (not ignored) are added. Deleted paths are
+        included and left for the caller to skip. None if git or REF fails.
+        REF is never read as an option, even when it starts with '-'.
+        """
+        changed = self._git_output('diff', '--name-only', '-z', '--relative', '--end-of-options', ref, '--')
+        if changed is None:
+            return None
+        untracked = self._git_output('ls-files', '--others', '--exclude-standard', '-z')
+        if untracked is None:
+            return None
+        return {os.fsdecode(p) for p in (changed + untracked).split(b"\0") if p}
+
+    def load_last_commits(self, paths: Iterable[str]) -> None:
+        """Resolve the last commit of each displayed path in one git log pass
+
+        Only paths tracked at HEAD are looked up, and the log is abandoned as
+        soon as all of them are resolved. Results are cached in the git dir
+        per HEAD commit, so repeat runs on the same commit skip git log.
+        """
+        info = self._repository_info()
+        if info is None:
+            return
+        git_dir, prefix, head = info
+
+        tracked = self._git_output('ls-tree', '-r', '--name-only', '-z', 'HEAD')
+        if tracked is None:
+            return
+        tracked_paths: Set[str] = {os.fsdecode(p) for p in tracked.split(b"\0") if p}
+
+        cache_path  = git_dir / LAST_COMMIT_CACHE
+        cached      = self._load_last_commit_cache(cache_path, head)
+        pending     = set()
+        for path in paths:
+            if path in self.last_commits or path not in tracked_paths:
+                continue
+            if prefix + path in cached:
+                self.last_commits[path] = tuple(cached[prefix + path])
+            else:
+                pending.add(path)
+
+        if not pending:
+            return
+
+        log = self._iter_log()
+        for commit, path in log:
+            if path in pending:
+                pending.discard(path)
+                self.last_commits[path] = commit
+                cached[prefix + path]   = commit
+                if not pending:
+                    break
+        log.close()
+
+        self._save_last_commit_cache(cache_path, head, cached)
+
+    def _load_last_commit_cache(self, cache_path: Path, head: str) -> Dict[str, list]:
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('head') != head:
+            return {}
+        return data.get('entries', {})
+
+    def _save_last_commit_cache(self, cache_path: Path, head: str, entries: Dict[str, list]) -> None:
+        tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'head': head, 'entries': entries}, f, separators=(',', ':'))
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+
+    def get_last_commit(self, path: Path) -> str:
+        """Returns '[hash date author]' for a file resolved by load_last_commits"""
+        try:
+            commit = self.last_commits.get(str(path.relative_to(self.root_path)))
+        except ValueError:
+            return ""
+        if commit is None:
+            return ""
+        commit_hash, timestamp, author = commit
+        return f"[{commit_hash[:7]} {time.strftime('%Y-%m-%d', time.gmtime(timestamp))} {author}]"
@@ -0,0 +1,247 @@
+"""
+Columnar in-memory tree index for TreeCatt
+"""
+
+import os
+import stat
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+NO_PARENT       = -1
+# Directories whose name -> row map is kept for find()
+CHILD_MAP_LIMIT = 256
+
+
+class TreeIndex:
+    """Compact, array-backed store of a scanned tree
+
+    Each entry is a row across parallel columns (parent index, interned name
+    id, size, mtime in nanoseconds, st_mode) instead of a Path object, so a
+    row costs a few dozen bytes. Full paths are only built on request.
+
+    With a digest_size, each row also has a fixed-width binary digest in one
+    bytearray column. Rows added with add_path() can be found back by path.
+    """
+
+    def __init__(self, root_path: Path, digest_size: int = 0):
+        self.root_path                      = Path(root_path)
+        self.digest_size                    = digest_size
+        self.names: List[str]               = []
+        self._name_ids: Dict[str, int]      = {}
+        self.parents                        = array('i')
+        self.name_ids                       = array('I')
+        self.sizes                          = array('q')
+        self.mtimes                         = array('q')
+        self.modes                          = array('I')
+        self.digests                        = bytearray()
+        # Sibling links, so the children of one row are listed without the CSR table
+        self.last_children                  = array('i')
+        self.prev_siblings                  = array('i')
+        self._child_offsets: Optional[array] = None
+        self._child_indexes: Optional[array] = None
+        # Directory rows created by add_path(), by path
+        self._dir_rows: Dict[str, int]      = {}
+        # Directory row -> {name id: non-directory row}, for find()
+        self._child_maps: Dict[int, Dict[int, int]] = {}
+
+        self.add(NO_PARENT, str(self.root_path), 0, 0, stat.S_IFDIR)
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def _intern(self, name: str) -> int:
+        """Return the id of a name, adding it to the name table if needed"""
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id                 = len(self.names)
+            self._name_ids[name]    = name_id
+            self.names.append(name)
+        return name_id
+
+    def add(self, parent: int, name: str, size: int, mtime_ns: int, mode: int) -> int:
+        """Append an entry and return its index"""
+        index   = len(self.parents)
+        name_id = self._intern(name)
+        self.parents.append(parent)
+        self.name_ids.append(name_id)
+        self.sizes.append(size)
+        self.mtimes.append(mtime_ns)
+        self.modes.append(mode)
+        self.digests.extend(bytes(self.digest_size))
+        self.last_children.append(NO_PARENT)
+        self.prev_siblings.append(NO_PARENT)
+        if parent != NO_PARENT:
+            self.prev_siblings[index]   = self.last_children[parent]
+            self.last_children[parent]  = index
+            child_map                   = self._child_maps.get(parent)
+            if child_map is not None and not stat.S_ISDIR(mode):
+                child_map[name_id] = index
+        self._child_offsets = None
+        return index
+
+    def add_stat(self, parent: int, name: str, st: os.stat_result) -> int:
+        """Append an entry from a stat result"""
+        return self.add(parent, name, st.st_size, st.st_mtime_ns, st.st_mode)
+
+    def _dir_row(self, directory: Path) -> int:
+        """Row of a directory under the root, created (with its parents) if needed"""
+        if directory == self.root_path or directory.parent == directory:
+            return 0
+        key = str(directory)
+        row = self._dir_rows.get(key)
+        if row is None:
+            parent              = self._dir_row(directory.parent)
+            row                 = self.add(parent, directory.name, 0, 0, stat.S_IFDIR)
+            self._dir_rows[key] = row
+        return row
+
+    def add_path(self, path: Path, size: int, mtime_ns: int = 0, mode: int = stat.S_IFREG) -> int:
+        """Append an entry by its path under the root, creating its directories"""
+        return self.add(self._dir_row(path.parent), path.name, size, mtime_ns, mode)
+
+    def find(self, path: Path) -> Optional[int]:
+        """Latest non-directory row added with add_path() for a path, or None"""
+        parent = 0 if path.parent == self.root_path else self._dir_rows.get(str(path.parent))
+        if parent is None:
+            return None
+        name_id = self._name_ids.get(path.name)
+        if name_id is None:
+            return None
+
+        child_map = self._child_maps.get(parent)
+        if child_map is None:
+            # Lookups come directory by directory: keep the maps of recent ones
+            if len(self._child_maps) >= CHILD_MAP_LIMIT:
+                self._child_maps.clear()
+            child_map   = {}
+            child       = self.last_children[parent]
+            while child != NO_PARENT:
+                if not self.is_dir(child):
+                    child_map.setdefault(self.name_ids[child], child)
+                child = self.prev_siblings[child]
+            self._child_maps[parent] = child_map
+        return child_map.get(name_id)
+
+    def set_digest(self, index: int, digest: bytes) -> None:
+        """Store the binary digest of an entry (digest_size bytes)"""
+        start                                       = index * self.digest_size
+        self.digests[start:start + self.digest_size] = digest
+
+    def digest(self, index: int) -> bytes:
+        """Return the binary digest of an entry"""
+        start = index * self.digest_size
+        return bytes(self.digests[start:start + self.digest_size])
+
+    def name(self, index: int) -> str:
+        """Return the entry name"""
+        return self.names[self.name_ids[index]]
+
+    def is_dir(self, index: int) -> bool:
+        """Check if the entry is a directory"""
+        return stat.S_ISDIR(self.modes[index])
+
+    def relpath(self, index: int) -> str:
+        """Build the path of an entry relative to the root"""
+        parts = []
+        while index > 0:
+            parts.append(self.name(index))
+            index = self.parents[index]
+        return os.sep.join(reversed(parts))
+
+    def path(self, index: int) -> Path:
+        """Build the absolute path of an entry"""
+        if index == 0:
+            return self.root_path
+        return self.root_path / self.relpath(index)
+
+    def _build_children(self) -> None:
+        """Build a CSR-style child table (offsets + flat child list)"""
+        count   = len(self.parents)
+        offsets = array('i', bytes(4 * (count + 1)))
+        for child in range(1, count):
+            offsets[self.parents[child] + 1] += 1
+        for i in range(count):
+            offsets[i + 1] += offsets[i]
+
+        fill    = array('i', offsets)
+        flat    = array('i', bytes(4 * max(count - 1, 0)))
+        for child in range(1, count):
+            parent              = self.parents[child]
+            flat[fill[parent]]  = child
+            fill[parent]        += 1
+
+        self._child_offsets = offsets
+        self._child_indexes = flat
+
+    def children(self, index: int) -> array:
+        """Return the indexes of the direct children of an entry"""
+        if self._child_offsets is None:
+            self._build_children()
+        return self._child_indexes[self._child_offsets[index]:self._child_offsets[index + 1]]
+
+    def sorted_children(self, index: int) -> List[int]:
+        """Return children sorted like sort_entries(..., 'name')"""
+        return sorted(self.children(index), key=lambda i: (not self.is_dir(i), self.name(i).lower()))
+
+    def iter_sorted(self, index: int = 0) -> Iterator[int]:
+        """Yield entry indexes depth-first, children in name order (root excluded)"""
+        stack = list(reversed(self.sorted_children(index)))
+        while stack:
+            current = stack.pop()
+            yield current
+            if self.is_dir(current):
+                stack.extend(reversed(self.sorted_children(current)))
+
+    def iter_files(self) -> Iterator[int]:
+        """Yield indexes of non-directory entries in sorted order"""
+        return (i for i in self.iter_sorted() if not self.is_dir(i))
+
+    @classmethod
+    def scan(cls,
+             root_path: Path,
+             ignore: Optional[Callable[[Path], bool]]   = None,
+             max_depth: Optional[int]                   = None,
+             follow_symlinks: bool                      = False,
+             one_file_system: bool                      = False) -> 'TreeIndex':
+        """Scan a directory tree into a new index
+
+        Symlinks are stored as links unless follow_symlinks is set; then each
+        directory is entered at most once, keyed by (st_dev, st_ino). With
+        one_file_system, directories on other devices are stored, not entered.
+        """
+        index   = cls(root_path)
+        pending = [(0, str(root_path), 0)]
+        root_st = os.stat(root_path)
+        visited = {(root_st.st_dev, root_st.st_ino)}
+
+        while pending:
+            parent, directory, depth = pending.pop()
+            if max_depth is not None and depth > max_depth:
+                continue
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except PermissionError:
+                continue
+
+            for entry in entries:
+                if ignore is not None and ignore(Path(entry.path)):
+                    continue
+                try:
+                    st = entry.stat(follow_symlinks=follow_symlinks)
+                except OSError:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                child = index.add_stat(parent, entry.name, st)
+                if stat.S_ISDIR(st.st_mode):
+                    key = (st.st_dev, st.st_ino)
+                    if one_file_system and st.st_dev != root_st.st_dev:
+                        continue
+                    if key not in visited:
+                        visited.add(key)
+                        pending.append((child, entry.path, depth + 1))
+
+        return index
@@ -0,0 +1,116 @@
+"""
+Per-language line statistics for TreeCatt
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from treecatt.constants import BINARY_EXTENSIONS, LANGUAGE_EXTENSIONS
+from treecatt.features.file import format_size, is_binary_chunk, open_for_read
+
+CHUNK_SIZE  = 1024 * 1024
+WHITESPACE  = b" \t\r\f\v"
+
+
+class LineCount(NamedTuple):
+    lines: int
+    blank: int
+    size: int
+
+
+def count_lines(path: Path) -> Optional[LineCount]:
+    """Count lines, blank lines and bytes of a text file; None if binary or unreadable
+
+    Works on raw bytes in large chunks: whitespace other than newlines is
+    deleted, so blank lines become empty strings between newlines. The
+    unterminated tail of a chunk is carried over to the next one.
+    """
+    if path.suffix.lower() in BINARY_EXTENSIONS:
+        return None
+
+    lines   = 0
+    blank   = 0
+    size    = 0
+    carry   = b""
+    last    = b"\n"
+    try:
+        with open_for_read(path) as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                if size == 0 and is_binary_chunk(chunk[:8192]):
+                    return None
+                size    += len(chunk)
+                last    = chunk[-1:]
+                parts   = (carry + chunk.translate(None, WHITESPACE)).split(b"\n")
+                carry   = parts.pop()
+                lines   += len(parts)
+                blank   += parts.count(b"")
+    except OSError:
+        return None
+
+    if last != b"\n":
+        # Unterminated last line
+        lines += 1
+        if not carry:
+            blank += 1
+    return LineCount(lines, blank, size)
+
+
+def language_of(path: Path) -> str:
+    """Language name from the extension; unknown extensions are shown as-is"""
+    suffix = path.suffix.lower()
+    return LANGUAGE_EXTENSIONS.get(suffix, suffix or "(no extension)")
+
+
+class LineStats:
+    """Aggregates line counts per language, counting files in parallel"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers                        = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        # language -> [files, lines, blank lines, bytes]
+        self.languages: Dict[str, List[int]]    = {}
+        self.binary_count                       = 0
+
+    def add(self, path: Path, count: Optional[LineCount]) -> None:
+        """Add one file's counts (None counts as a skipped binary file)"""
+        if count is None:
+            self.binary_count += 1
+            return
+        totals = self.languages.setdefault(language_of(path), [0, 0, 0, 0])
+        totals[0] += 1
+        totals[1] += count.lines
+        totals[2] += count.blank
+        totals[3] += count.size
+
+    def collect(self, files: Iterable[Path]) -> 'LineStats':
+        """Count every file; reads run in threads (file I/O releases the GIL)"""
+        files = list(files)
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            for path, count in zip(files, executor.map(count_lines, files)):
+                self.add(path, count)
+        return self
+
+    @staticmethod
+    def _print_row(language: str, row: List[int], width: int) -> None:
+        files, lines, blank, size = row
+        print(f"  {language:<{width}} {files:>8} {lines:>10} {blank:>10} {format_size(size):>10}")
+
+    def print_report(self):
+        """Print the per-language table, largest line count first"""
+        if not self.languages:
+            return
+
+        rows    = sorted(self.languages.items(), key=lambda item: (-item[1][1], item[0]))
+        totals  = [sum(column) for column in zip(*(row for _, row in rows))]
+        width   = max(8, *(len(language) for language, _ in rows))
+
+        print("\nLines by language:")
+        print("-" * (width + 42))
+        print(f"  {'Language':<{width}} {'Files':>8} {'Lines':>10} {'Blank':>10} {'Size':>10}")
+        for language, row in rows:
+            self._print_row(language, row, width)
+        print("-" * (width + 42))
+        self._print_row("Total", totals, width)
+        if self.binary_count:
+            print(f"  ({self.binary_count} binary files not counted)")
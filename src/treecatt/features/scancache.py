@@ -0,0 +1,98 @@
+"""
+Directory listing cache for TreeCatt
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from treecatt.constants import RACY_WINDOW_NS
+from treecatt.features.filter import entry_kind
+
+CACHE_VERSION = 1
+
+
+class ListingCache:
+    """Caches directory listings, validated by the directory's own stat
+
+    Adding, removing or renaming an entry updates the directory's mtime, so
+    a listing stays valid as long as (st_dev, st_ino, st_mtime_ns) match.
+    The type of each entry is kept too: it cannot change without an unlink
+    or rename, which also updates the mtime. Sizes and mtimes of files are
+    not cached, since writing to a file leaves its directory untouched.
+
+    Listings read within RACY_WINDOW_NS of the directory's mtime are racy: a
+    change in the same mtime tick would keep the key, so they are read again
+    on every use (and never persisted) until the directory is old enough.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Tuple[Tuple[int, int, int], Dict[str, str]]]   = {}
+        self._racy: Set[str]                                                    = set()
+        self.hits                                                               = 0
+        self.misses                                                             = 0
+        # New non-racy listings (directory, dev, ino, mtime_ns, listing), queued for a Checkpoint
+        self.journal: Optional[Deque[tuple]]                                    = None
+
+    def _listing(self, directory: Path) -> Dict[str, str]:
+        """Return {name: kind} for a directory, from cache when still valid"""
+        st      = os.stat(directory)
+        key     = (st.st_dev, st.st_ino, st.st_mtime_ns)
+        cached  = self.entries.get(str(directory))
+
+        if cached is not None and cached[0] == key and str(directory) not in self._racy:
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        with os.scandir(directory) as it:
+            listing = {entry.name: entry_kind(entry) for entry in it}
+        self.entries[str(directory)] = (key, listing)
+        if time.time_ns() - st.st_mtime_ns < RACY_WINDOW_NS:
+            self._racy.add(str(directory))
+        else:
+            self._racy.discard(str(directory))
+            if self.journal is not None:
+                self.journal.append((str(directory), *key, listing))
+        return listing
+
+    def list(self, directory: Path) -> List[str]:
+        """Return the entry names of a directory, from cache when still valid"""
+        return list(self._listing(directory))
+
+    def kind(self, path: Path) -> Optional[str]:
+        """Type of an entry from its directory's cached listing (see entry_kind); None if not listed"""
+        cached = self.entries.get(str(path.parent))
+        return cached[1].get(path.name) if cached is not None else None
+
+    def load(self, cache_path: Path) -> None:
+        """Load a persisted scan cache (silently ignored if absent or unreadable)"""
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.restore(data)
+
+    def restore(self, data: dict) -> None:
+        """Merge listings produced by dump (ignored if of another version)"""
+        if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+            return
+        for directory, (dev, ino, mtime_ns, listing) in data.get('directories', {}).items():
+            self.entries[directory] = ((dev, ino, mtime_ns), listing)
+
+    def dump(self) -> dict:
+        """The listings as JSON data, without racy ones (a snapshot: safe while scanning)"""
+        racy        = set(self._racy)
+        directories = {directory: [*key, listing] for directory, (key, listing) in list(self.entries.items())
+                       if directory not in racy}
+        return {'version': CACHE_VERSION, 'directories': directories}
+
+    def save(self, cache_path: Path) -> None:
+        """Persist the scan cache atomically"""
+        tmp_path = Path(f"{cache_path}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.dump(), f, separators=(',', ':'))
+        os.replace(tmp_path, cache_path)
@@ -0,0 +1,173 @@
+"""
+Near-duplicate text file detection (MinHash + LSH) for TreeCatt
+"""
+
+import os
+import random
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from treecatt.features.file import format_size
+from treecatt.features.index import TreeIndex
+
+MERSENNE_PRIME  = (1 << 61) - 1
+MAX_HASH        = (1 << 32) - 1
+
+
+def shingle(data: bytes, size: int = 5) -> Set[int]:
+    """Hash every run of `size` consecutive words of a text"""
+    words = data.split()
+    if len(words) <= size:
+        return {zlib.crc32(b" ".join(words))} if words else set()
+    return {zlib.crc32(b" ".join(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+def choose_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Pick (bands, rows) whose LSH S-curve crosses closest to the threshold"""
+    best        = (num_perm, 1)
+    best_error  = float('inf')
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows    = num_perm // bands
+        error   = abs((1 / bands) ** (1 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class NearDuplicateDetector:
+    """Groups similar text files using MinHash signatures and banded LSH
+
+    Signatures are one-permutation MinHash: each shingle is hashed once and
+    the hash range is split into num_perm bins, keeping the minimum of each
+    bin. Matching bins estimate the Jaccard similarity like num_perm
+    independent permutations would, at the cost of a single hash per shingle.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, shingle_size: int = 5):
+        rng                                     = random.Random(1)
+        self.threshold                          = threshold
+        self.num_perm                           = num_perm
+        self.shingle_size                       = shingle_size
+        self.bands, self.rows                   = choose_bands(threshold, num_perm)
+        self.permutation                        = (rng.randrange(1, MERSENNE_PRIME), rng.randrange(MERSENNE_PRIME))
+        self.files                              = TreeIndex(Path(os.sep))
+        self.file_rows                          = array('i')
+        self.signatures: List[Tuple[int, ...]]  = []
+        self.buckets: Dict[tuple, List[int]]    = {}
+
+    def signature(self, shingles: Set[int]) -> Tuple[int, ...]:
+        """Compute the one-permutation MinHash signature of a shingle set
+
+        Empty bins are filled from the next non-empty bin to the right
+        (rotation densification), tagged with the distance so that they
+        only match bins filled the same way.
+        """
+        a, b    = self.permutation
+        bins    = self.num_perm
+        empty   = MAX_HASH + 1
+        minima  = [empty] * bins
+        for x in shingles:
+            h       = ((a * x + b) % MERSENNE_PRIME) & MAX_HASH
+            i       = (h * bins) >> 32
+            if h < minima[i]:
+                minima[i] = h
+
+        signature = list(minima)
+        for i in range(bins):
+            distance = 1
+            while signature[i] == empty:
+                value = minima[(i + distance) % bins]
+                if value != empty:
+                    signature[i] = value + (distance << 32)
+                distance += 1
+        return tuple(signature)
+
+    def add(self, path: Path, data: bytes) -> bool:
+        """Register a text file; returns False if it has no words"""
+        shingles = shingle(data, self.shingle_size)
+        if not shingles:
+            return False
+
+        signature   = self.signature(shingles)
+        file_id     = len(self.file_rows)
+        self.file_rows.append(self.files.add_path(path, len(data)))
+        self.signatures.append(signature)
+
+        for band in range(self.bands):
+            key = (band, signature[band * self.rows:(band + 1) * self.rows])
+            self.buckets.setdefault(key, []).append(file_id)
+        return True
+
+    def path(self, file_id: int) -> Path:
+        """Return the path of a registered file"""
+        return self.files.path(self.file_rows[file_id])
+
+    def size(self, file_id: int) -> int:
+        """Return the size of a registered file"""
+        return self.files.sizes[self.file_rows[file_id]]
+
+    def similarity(self, first: int, second: int) -> float:
+        """Estimate the Jaccard similarity of two registered files"""
+        a, b = self.signatures[first], self.signatures[second]
+        return sum(1 for x, y in zip(a, b) if x == y) / self.num_perm
+
+    def _groups(self) -> List[Tuple[float, List[int]]]:
+        """Return groups of similar file ids with their lowest pairwise similarity
+
+        Groups are built by leader clustering: a file joins a leader's group
+        only if it is similar enough to every member, so chains of pairwise
+        matches (a~b, b~c, ...) never pull dissimilar files together.
+        """
+        neighbours: Dict[int, Set[int]]     = {}
+        checked: Set[Tuple[int, int]]       = set()
+        for members in self.buckets.values():
+            for pos, first in enumerate(members):
+                for second in members[pos + 1:]:
+                    if (first, second) in checked:
+                        continue
+                    checked.add((first, second))
+                    if self.similarity(first, second) >= self.threshold:
+                        neighbours.setdefault(first, set()).add(second)
+                        neighbours.setdefault(second, set()).add(first)
+
+        assigned: Set[int]                      = set()
+        groups: List[Tuple[float, List[int]]]   = []
+        for leader in sorted(neighbours):
+            if leader in assigned:
+                continue
+            group       = [leader]
+            candidates  = sorted(neighbours[leader] - assigned, key=lambda i: (-self.similarity(leader, i), i))
+            for candidate in candidates:
+                if all(self.similarity(candidate, member) >= self.threshold for member in group[1:]):
+                    group.append(candidate)
+            if len(group) < 2:
+                continue
+
+            assigned.update(group)
+            score = min(self.similarity(first, second)
+                        for pos, first in enumerate(group) for second in group[pos + 1:])
+            groups.append((score, sorted(group)))
+        return groups
+
+    def get_near_duplicates(self) -> List[Tuple[float, List[Path]]]:
+        """Return groups of similar files with their lowest pairwise similarity"""
+        groups = [(score, [self.path(i) for i in group]) for score, group in self._groups()]
+        return sorted(groups, key=lambda group: (-group[0], str(group[1][0])))
+
+    def print_near_duplicates(self, root_path: Path):
+        """Print near-duplicate files report"""
+        groups = sorted(self._groups(), key=lambda group: (-group[0], str(self.path(group[1][0]))))
+
+        if not groups:
+            return
+
+        print("\nNear-duplicate files found:")
+        print("-" * 70)
+        for score, files in groups:
+            print(f"\nSimilarity: {score:.0%}")
+            for i in files:
+                print(f"  - {self.path(i).relative_to(root_path)} ({format_size(self.size(i))})")
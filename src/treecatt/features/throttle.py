@@ -0,0 +1,181 @@
+"""
+Low-impact I/O mode (--gentle) for TreeCatt
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from treecatt.features.file import format_size
+
+DEFAULT_IO_LIMIT        = 10 * 1024 * 1024
+DEFAULT_FILES_LIMIT     = 200
+# Pages of recently read files kept cached, so that a run reading a file
+# several times (binary check, search, digest, contents) reads it from disk once
+DEFAULT_CACHE_BUDGET    = 64 * 1024 * 1024
+NICE_INCREMENT          = 10
+
+# ioprio_set(2) is not exposed by the os module
+IOPRIO_SYSCALLS         = {'x86_64': 251, 'i686': 289, 'aarch64': 30, 'armv7l': 314, 'ppc64le': 273}
+IOPRIO_WHO_PROCESS      = 1
+IOPRIO_CLASS_BE         = 2
+IOPRIO_CLASS_SHIFT      = 13
+IOPRIO_LOWEST_BE        = 7
+
+
+class TokenBucket:
+    """Token bucket allowing `rate` units per second with bursts up to `burst`"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate       = rate
+        self.burst      = burst if burst is not None else rate
+        self.tokens     = self.burst
+        self.updated    = time.monotonic()
+        self.lock       = threading.Lock()
+
+    def consume(self, amount: float) -> float:
+        """Take `amount` tokens, sleeping until they are available; returns the time slept
+
+        Amounts larger than the burst are allowed: the bucket goes into debt
+        and later callers wait for it to refill.
+        """
+        with self.lock:
+            now             = time.monotonic()
+            self.tokens     = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated    = now
+            self.tokens     -= amount
+            wait            = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class IOThrottle:
+    """Caps read throughput and file opens, and keeps files out of the page cache
+
+    Files are tracked by (st_dev, st_ino). The pages of files read recently
+    (up to cache_budget bytes) are kept until the file is evicted or the run
+    finishes: reopening such a file is neither counted against the limits
+    nor read from disk again.
+    """
+
+    def __init__(self,
+                 bytes_per_second: float    = DEFAULT_IO_LIMIT,
+                 files_per_second: float    = DEFAULT_FILES_LIMIT,
+                 cache_budget: int          = DEFAULT_CACHE_BUDGET):
+        self.bytes_per_second       = bytes_per_second
+        self.files_per_second       = files_per_second
+        self.cache_budget           = cache_budget
+        self.byte_bucket            = TokenBucket(bytes_per_second)
+        self.file_bucket            = TokenBucket(files_per_second)
+        self.files                  = 0
+        self.bytes                  = 0
+        self.waited                 = 0.0
+        self.priority: List[str]    = []
+        self.lock                   = threading.Lock()
+        # (st_dev, st_ino) -> [path, bytes read], least recently used first
+        self.cached: 'OrderedDict[Tuple[int, int], list]'  = OrderedDict()
+        self.cached_bytes                                   = 0
+
+    def opened(self, key: Tuple[int, int]) -> int:
+        """Account for opening a file; returns how many leading bytes of it are still cached"""
+        with self.lock:
+            entry = self.cached.get(key)
+            if entry is not None:
+                self.cached.move_to_end(key)
+                return entry[1]
+
+        waited = self.file_bucket.consume(1)
+        with self.lock:
+            self.files  += 1
+            self.waited += waited
+        return 0
+
+    def read(self, size: int) -> None:
+        """Account for `size` bytes read"""
+        if not size:
+            return
+        waited = self.byte_bucket.consume(size)
+        with self.lock:
+            self.bytes  += size
+            self.waited += waited
+
+    def closed(self, key: Tuple[int, int], path: str, fd: int, size: int) -> None:
+        """Keep the first `size` bytes of a closed file cached, dropping the oldest files over budget"""
+        evicted = []
+        with self.lock:
+            entry           = self.cached.pop(key, None)
+            previous        = entry[1] if entry is not None else 0
+            size            = max(size, previous)
+            self.cached_bytes += size - previous
+            self.cached[key] = [path, size]
+            while self.cached_bytes > self.cache_budget and self.cached:
+                evicted_key, (evicted_path, evicted_size) = self.cached.popitem(last=False)
+                self.cached_bytes -= evicted_size
+                evicted.append(evicted_path if evicted_key != key else fd)
+
+        for target in evicted:
+            if isinstance(target, int):
+                self.drop_cache(target)
+            else:
+                self._drop_path(target)
+
+    def finish(self) -> None:
+        """Drop the pages of every file still kept cached (end of the run)"""
+        with self.lock:
+            paths               = [path for path, _ in self.cached.values()]
+            self.cached         = OrderedDict()
+            self.cached_bytes   = 0
+        for path in paths:
+            self._drop_path(path)
+
+    @classmethod
+    def _drop_path(cls, path: str) -> None:
+        try:
+            fd = os.open(path, os.O_RDONLY | getattr(os, 'O_NONBLOCK', 0))
+        except OSError:
+            return
+        try:
+            cls.drop_cache(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def drop_cache(fd: int) -> None:
+        """Ask the kernel to drop the pages of a file that was just read"""
+        if hasattr(os, 'posix_fadvise'):
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
+
+    def lower_priority(self) -> None:
+        """Lower CPU and I/O priority where the platform allows it"""
+        try:
+            os.nice(NICE_INCREMENT)
+            self.priority.append(f"nice +{NICE_INCREMENT}")
+        except (AttributeError, OSError):
+            pass
+
+        syscall = IOPRIO_SYSCALLS.get(os.uname().machine) if sys.platform.startswith('linux') else None
+        if syscall is None:
+            return
+        try:
+            import ctypes
+            libc    = ctypes.CDLL(None, use_errno=True)
+            ioprio  = (IOPRIO_CLASS_BE << IOPRIO_CLASS_SHIFT) | IOPRIO_LOWEST_BE
+            if libc.syscall(syscall, IOPRIO_WHO_PROCESS, 0, ioprio) == 0:
+                self.priority.append(f"I/O best-effort {IOPRIO_LOWEST_BE}")
+        except (OSError, AttributeError):
+            pass
+
+    def print_report(self) -> None:
+        """Report the limits and how long reads were held back (on stderr)"""
+        priority = ", ".join(self.priority) if self.priority else "unchanged"
+        print(f"\nGentle mode: limits {format_size(self.bytes_per_second)}/s, {self.files_per_second:g} files/s; "
+              f"priority {priority}", file=sys.stderr)
+        print(f"  - {self.files} files opened, {format_size(self.bytes)} read, "
+              f"throttled for {self.waited:.1f}s", file=sys.stderr)
@@ -5,19 +5,294 @@ TreeCatt - Main module
 
 import os
 import sys
+import stat
 import argparse
+import io
 from pathlib import Path
-from typing import List, Optional
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterator, List, Optional, Set, TextIO, Tuple
 
-from treecatt.constants import DEFAULT_IGNORE, SENSITIVE_FILES
-from treecatt.features import (
-    GitStatusManager, ChecksumManager,
-    format_size, get_permissions, get_file_dates, matches_date_filter,
-    read_file_content, should_ignore, search_in_file, sort_entries
+from treecatt.constants import BINARY_EXTENSIONS, DEFAULT_IGNORE, SENSITIVE_FILES, default_socket_path
+from treecatt.features.file import (
+    file_kind, format_size, is_archive, is_binary_chunk, get_permissions, get_file_dates, load_file_bytes,
+    matches_date_filter, read_file_bytes, read_text_bytes, render_bytes, set_io_throttle
 )
+from treecatt.features.filter import (
+    content_matches, entry_kind, kind_is, should_ignore, search_in_file, sort_entries, select_entries
+)
+
+# Optional features are imported where they are used, to keep startup fast
+if TYPE_CHECKING:
+    from treecatt.features.archive import MemberTree
+    from treecatt.features.checksum import ChecksumManager
+    from treecatt.features.daemon import WarmState
+    from treecatt.features.index import TreeIndex
+    from treecatt.features.scancache import ListingCache
+    from treecatt.features.similarity import NearDuplicateDetector
 
 VERSION = "0.1.2"
 
+OUTPUT_BUFFER_SIZE  = 1024 * 1024
+CONTENT_RULE        = ("─" * 70).encode()
+END_OF_FILE_RULE    = ("─" * 27 + "END OF FILE" + "─" * 32).encode()
+
+HELP_EPILOG = """
+Examples:
+USAGE EXAMPLES — COMPLETE REFERENCE
+==================================
+
+BASIC USAGE
+-----------
+  treecatt
+      Run full analysis on the current directory with default settings.
+
+  treecatt /var/www
+      Run full analysis on a specific path.
+
+
+TREE DISPLAY MODES
+------------------
+  treecatt --tree
+      Display only the directory tree (no file contents).
+
+  treecatt --tree --depth 3
+      Display the tree up to a maximum depth of 3 levels.
+
+  treecatt --tree --tree-size
+      Display file sizes next to each file in the tree.
+
+  treecatt --tree --permissions
+      Display Unix permissions in the tree output.
+
+  treecatt --tree --dates
+      Display last modification dates in the tree.
+
+  treecatt --tree --git-status
+      Display Git status (modified, untracked, ignored) in the tree.
+
+  treecatt --tree --tree-size --permissions --dates --git-status
+      Full detailed tree view with all available metadata.
+
+  treecatt --tree --max-entries 50
+      Show at most 50 entries per directory, then "… and N more".
+
+  treecatt --tree --tree-size --max-entries 50
+      Same, with the total size of the entries left out.
+
+  treecatt --tree --count-above 10000
+      Only count the entries of directories holding more than 10000.
+
+
+FILTERING FILES
+---------------
+  treecatt --ignore "*.log" "*.tmp" "__pycache__"
+      Ignore additional file or directory patterns.
+
+  treecatt --no-default-ignore
+      Disable built-in ignore rules (e.g. .git, node_modules).
+
+  treecatt --include "*.py" "*.md"
+      Include only files matching these patterns.
+
+  treecatt --filter-date 24h
+      Show only files modified in the last 24 hours.
+
+  treecatt --filter-date 7d
+      Show only files modified in the last 7 days.
+
+  treecatt --max-size 1MB
+      Exclude files larger than the specified size.
+
+  treecatt --max-size 500KB
+      Exclude files larger than 500 KB.
+
+
+FILE CONTENT DISPLAY
+--------------------
+  treecatt --view .env config.yaml secrets.json
+      Force display of sensitive or normally hidden files.
+
+  treecatt --line-numbers
+      Display line numbers when showing file contents.
+
+
+ANALYSIS FEATURES
+-----------------
+  treecatt --checksums md5
+      Calculate MD5 checksums for all files.
+
+  treecatt --checksums sha256
+      Calculate SHA-256 checksums for all files.
+
+  treecatt --checksums git --duplicates
+      Use git blob IDs: clean tracked files take their ID from the git
+      index without being read; only modified and untracked files are hashed.
+
+  treecatt --checksums sha256 --duplicates
+      Detect duplicate files using cryptographic hashes.
+
+  treecatt --checksums sha256 --checksum-cache ~/.cache/treecatt.json
+      Reuse digests of files whose size and mtime are unchanged since the
+      last run; directories also get a Merkle digest of their contents.
+
+  treecatt --checksums sha256 --duplicates --checkpoint scan.ckpt /mnt/archive
+  treecatt --checksums sha256 --duplicates --checkpoint scan.ckpt --resume /mnt/archive
+      Journal new digests and listings every 30s and on ^C; the resumed run only
+      stats what was already done, and its output matches a full run.
+
+  treecatt --tree --scan-cache ~/.cache/treecatt-scan.json /mnt/nfs/data
+      Reuse the listing and entry types of every directory whose mtime is
+      unchanged since the last run: directories are not stat'ed, the tree
+      stats each file once for its size, and the content pass stats none.
+
+  treecatt --compare /data /mnt/replica
+      Walk both trees at once and print only what differs
+      (+ only in second, - only in first, M modified, T type changed).
+
+  treecatt --compare /data /mnt/replica --checksums sha256 --checksum-cache replica.json
+      Repeat verification only reads files changed since the previous run.
+
+  treecatt --stats-lines
+      Count files, lines, blank lines and bytes per language (cloc-style),
+      with the same ignore rules and binary detection as the tree.
+
+  treecatt --near-duplicates
+      Group text files that are near-copies (default similarity 0.8).
+
+  treecatt --near-duplicates --near-threshold 0.9 src/
+      Only group files that are at least 90% similar.
+
+
+SEARCH
+------
+  treecatt --search "TODO"
+      Search for a text pattern inside all analyzed files.
+
+  treecatt --search "password"
+      Search for potentially sensitive keywords.
+
+
+SORTING
+-------
+  treecatt --sort name
+      Sort files alphabetically (default).
+
+  treecatt --sort size
+      Sort files by size.
+
+  treecatt --sort date
+      Sort files by modification date.
+
+  treecatt --sort ext
+      Sort files by file extension.
+
+
+COMBINED REAL-WORLD EXAMPLES
+----------------------------
+  treecatt --tree --depth 4 --include "*.py" --sort size
+      Show a Python project tree, limited to 4 levels, sorted by file size.
+
+  treecatt --search "FIXME" --filter-date 2w
+      Search for recent FIXME comments from the last 2 weeks.
+
+  treecatt --checksums sha1 --duplicates --max-size 5MB
+      Find duplicate files smaller than 5 MB using SHA-1 hashes.
+
+  treecatt --tree --git-status --ignore node_modules dist
+      Show project tree while ignoring build artifacts.
+
+  treecatt --tree --last-commit
+      Annotate each file with its last commit (hash, date, author). One
+      git log pass serves the whole tree; results are cached per HEAD.
+
+  treecatt --checksums sha256 --gentle --io-limit 5MB /var/lib/app
+      Audit a live host: reads are capped at 5MB/s and 200 files/s, read
+      files are dropped from the page cache once no longer needed (each is
+      read from disk once), CPU and I/O priority are lowered, and the
+      throttling applied is reported on stderr.
+
+  treecatt --tree --checksums sha256 --duplicates services/*
+      Scan several roots concurrently in one process and print them in
+      order; duplicates are detected across all roots.
+
+  treecatt --tree --archives --checksums md5 --duplicates artifacts/
+      List the files inside zip/jar/war/whl and tar archives as virtual
+      directories, checksum and search their members and dump their
+      contents, streaming from the archive (nothing is extracted).
+
+  treecatt --dedupe-content
+      Print each distinct file body once; later copies show
+      [identical to <path>] (reuses --checksums digests when enabled).
+
+  treecatt --since origin/main
+      Only show files changed since origin/main, including uncommitted and
+      untracked ones; unchanged directories are never entered.
+
+  treecatt --tree -x /
+      Stay on the filesystem of the analyzed path (mount points are shown
+      but not entered). FIFOs, sockets and devices are labelled, never read.
+
+  treecatt --tree --follow-symlinks /srv/shared
+      Follow symlinks (shown as name -> target); each directory is scanned
+      at most once, so link loops and repeated links are not walked again.
+
+  treecatt --view .env --line-numbers --search "API_KEY"
+      Inspect environment files and search for API keys.
+
+
+BUNDLING
+--------
+  treecatt --bundle project.bundle
+      Write the tree and raw text file contents to project.bundle, with an
+      offset index (path, offset, length, SHA-256 checksum) in project.bundle.idx.
+
+  treecatt --bundle project.bundle --checksums sha256
+      Same, reusing the tree's checksums in the index instead of hashing
+      the copied bytes again.
+
+
+SERVER MODE
+-----------
+  treecatt serve
+      Keep scanned directories, git status and checksums warm in memory and
+      answer treecatt commands over a Unix socket. While it runs, treecatt
+      forwards invocations to it automatically (TREECATT_NO_DAEMON=1 opts out).
+
+
+MISC
+----
+  treecatt --version
+      Display TreeCatt version information.
+        """
+
+
+class ScanCancelled(Exception):
+    """Raised in a scanning thread after TreeCatt.cancel()"""
+
+
+class _TextSink:
+    """Binary writer adapter for text-only streams (e.g. io.StringIO)"""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def write(self, data: bytes) -> int:
+        return self.stream.write(data.decode('utf-8', errors='replace'))
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def binary_stdout() -> BinaryIO:
+    """Return a large-buffered binary writer on top of sys.stdout"""
+    sys.stdout.flush()
+    try:
+        return open(sys.stdout.fileno(), 'wb', buffering=OUTPUT_BUFFER_SIZE, closefd=False)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        pass
+    if hasattr(sys.stdout, 'buffer'):
+        return sys.stdout.buffer
+    return _TextSink(sys.stdout)
+
 
 class TreeCatt:
     """Main TreeCatt class for tree generation and file display"""
@@ -31,6 +306,7 @@ class TreeCatt:
                  show_tree_size: bool                   = False,
                  show_line_numbers: bool                = False,
                  show_git_status: bool                  = False,
+                 show_last_commit: bool                 = False,
                  show_permissions: bool                 = False,
                  show_dates: bool                       = False,
                  show_checksums: bool                   = False,
@@ -38,10 +314,27 @@ class TreeCatt:
                  filter_by_date: Optional[str]          = None,
                  search_content: Optional[str]          = None,
                  show_duplicates: bool                  = False,
+                 near_duplicates: Optional[float]       = None,
+                 stats_lines: bool                      = False,
                  sort_by: str                           = 'name',
                  max_depth: Optional[int]               = None,
                  include_only: Optional[List[str]]      = None,
-                 no_default_ignore: bool                = False):
+                 no_default_ignore: bool                = False,
+                 bundle_path: Optional[str]             = None,
+                 checksum_cache: Optional[str]          = None,
+                 scan_cache: Optional[str]              = None,
+                 checkpoint_path: Optional[str]         = None,
+                 follow_symlinks: bool                  = False,
+                 max_entries: Optional[int]             = None,
+                 count_above: Optional[int]             = None,
+                 one_file_system: bool                  = False,
+                 archives: bool                         = False,
+                 since: Optional[str]                   = None,
+                 dedupe_content: bool                   = False,
+                 archive_member_limit: int              = 64 * 1024 * 1024,
+                 checksum_manager: Optional['ChecksumManager'] = None,
+                 listing_cache: Optional['ListingCache'] = None,
+                 state: Optional['WarmState']           = None):
 
         self.root_path                  = Path(root_path).resolve()
         self.max_file_size              = max_file_size
@@ -49,20 +342,46 @@ class TreeCatt:
         self.show_tree_size             = show_tree_size
         self.show_line_numbers          = show_line_numbers
         self.show_git_status            = show_git_status
+        self.show_last_commit           = show_last_commit
         self.show_permissions           = show_permissions
         self.show_dates                 = show_dates
         self.show_checksums             = show_checksums
         self.filter_by_date             = filter_by_date
         self.search_content             = search_content
         self.show_duplicates            = show_duplicates
+        self.near_duplicates            = near_duplicates
+        self.stats_lines                = stats_lines
         self.sort_by                    = sort_by
         self.max_depth                  = max_depth
         self.include_only               = set(include_only) if include_only else None
-
-        # Build ignore patterns
-        self.ignore_patterns = set(DEFAULT_IGNORE) if not no_default_ignore else set()
-        if ignore_patterns:
-            self.ignore_patterns.update(ignore_patterns)
+        self.bundle_path                = Path(bundle_path) if bundle_path else None
+        self.checksum_cache             = Path(checksum_cache) if checksum_cache else None
+        self.scan_cache                 = Path(scan_cache) if scan_cache else None
+        # The bundle and its index are never listed, even when written inside the root
+        self.output_paths: Set[Path]    = set()
+        if bundle_path:
+            from treecatt.features.bundle import INDEX_SUFFIX
+            out_path            = Path(bundle_path).resolve()
+            self.output_paths   = {out_path, out_path.with_name(out_path.name + INDEX_SUFFIX)}
+        self.follow_symlinks            = follow_symlinks
+        self.max_entries                = max_entries
+        self.count_above                = count_above
+        self.one_file_system            = one_file_system
+        self.archives                   = archives
+        self.since                      = since
+        self.dedupe_content             = dedupe_content
+        self.archive_member_limit       = archive_member_limit
+        self.root_device                = None
+        if one_file_system:
+            try:
+                self.root_device = self.root_path.stat().st_dev
+            except OSError:
+                pass
+
+        # Build ignore patterns (--compare only applies the explicit ones)
+        self.user_ignore_patterns   = set(ignore_patterns) if ignore_patterns else set()
+        self.ignore_patterns        = set(DEFAULT_IGNORE) if not no_default_ignore else set()
+        self.ignore_patterns.update(self.user_ignore_patterns)
 
         # Handle sensitive files
         self.sensitive_patterns = set(SENSITIVE_FILES)
@@ -73,146 +392,668 @@ class TreeCatt:
         self.file_count         = 0
         self.dir_count          = 0
         self.skipped_count      = 0
+        self.hidden_count       = 0
         self.total_size         = 0
-        # Initialize features
-        self.git_manager        = GitStatusManager(self.root_path) if show_git_status else None
-        self.checksum_manager   = ChecksumManager(checksum_type) if show_checksums else None
+        self.archive_members    = 0
+        self.archive_size       = 0
+        # --dedupe-content: (digest type, digest) -> path whose content was printed
+        self.printed_contents: Dict[Tuple[str, str], bytes] = {}
+        # Initialize features (reusing warm server state, or caches shared by the roots of one run)
+        self.listing_cache      = listing_cache or (state.listings if state else None)
+        if scan_cache:
+            from treecatt.features.scancache import ListingCache
+            self.listing_cache = self.listing_cache or ListingCache()
+            self.listing_cache.load(self.scan_cache)
+        if checkpoint_path and self.listing_cache is None:
+            from treecatt.features.scancache import ListingCache
+            self.listing_cache = ListingCache()
+        # Set from another thread to stop a concurrent scan (see run_roots)
+        self.cancelled          = False
+        self.git_manager        = None
+        self.checksum_manager   = None
+        if show_git_status or show_last_commit:
+            from treecatt.features.git import GitStatusManager
+            if state:
+                self.git_manager = state.git_manager(self.root_path)
+            else:
+                self.git_manager = GitStatusManager(self.root_path, load_status=show_git_status)
+        # --since: directory (relative to the root, '.' for the root) -> changed children
+        self.changed_children: Optional[Dict[str, Set[str]]] = None
+        if since:
+            from treecatt.features.git import GitStatusManager
+            git_manager = self.git_manager or GitStatusManager(self.root_path, load_status=False)
+            changed     = git_manager.changed_since(since)
+            if changed is not None:
+                self.changed_children = self._group_paths(changed)
+        if show_checksums and checksum_manager is not None:
+            self.checksum_manager = checksum_manager
+        elif show_checksums:
+            from treecatt.features.checksum import ChecksumManager
+            self.checksum_manager = ChecksumManager(checksum_type, bool(checksum_cache or checkpoint_path or state))
+            if state:
+                self.checksum_manager.cache = state.digest_cache(checksum_type)
+            if self.checksum_cache:
+                self.checksum_manager.load_cache(self.checksum_cache)
+        if show_checksums:
+            if checksum_type == 'git':
+                from treecatt.features.git import GitStatusManager
+                git_manager = self.git_manager or GitStatusManager(self.root_path, load_status=False)
+                self.checksum_manager.use_known_digests(self.root_path, git_manager.clean_blob_ids())
 
     def get_tree_structure(self, directory: Path, prefix: str = "", depth: int = 0) -> List[str]:
         """Generate the tree structure"""
+        return self._build_tree(directory, prefix, depth)[0]
+
+    def _entry_stat(self, entry: Path) -> Optional[os.stat_result]:
+        """Stat an entry once: through symlinks only with --follow-symlinks
+
+        Dangling links fall back to lstat, so they classify as links.
+        """
+        try:
+            return entry.stat() if self.follow_symlinks else entry.lstat()
+        except OSError:
+            try:
+                return entry.lstat()
+            except OSError:
+                return None
+
+    def _is_link(self, entry: Path, st: os.stat_result) -> bool:
+        """Check if an entry is a symlink, from its _entry_stat() result when links are not followed
+
+        With --follow-symlinks the stat went through the link: the listing
+        cache's type is used when known, else the link is lstat'ed.
+        """
+        if not self.follow_symlinks:
+            return stat.S_ISLNK(st.st_mode)
+        kind = self._listed_kind(entry)
+        return kind == 'l' if kind is not None else entry.is_symlink()
+
+    def _first_visit(self, st: os.stat_result, visited: Set[Tuple[int, int]]) -> bool:
+        """Record a directory by (st_dev, st_ino); False if it was already scanned
+
+        Only needed when following symlinks: without links there are no cycles.
+        """
+        if not self.follow_symlinks:
+            return True
+        key = (st.st_dev, st.st_ino)
+        if key in visited:
+            return False
+        visited.add(key)
+        return True
+
+    def _cached_kind(self, entry: Path) -> Optional[str]:
+        """Entry type from the listing cache, sparing a stat ('d', 'f', 'l' or 'o')
+
+        Only used when neither --follow-symlinks nor -x need the stat itself.
+        """
+        if self.listing_cache is None or self.follow_symlinks or self.root_device is not None:
+            return None
+        return self.listing_cache.kind(entry)
+
+    def _listed_kind(self, entry: Path) -> Optional[str]:
+        """Entry type from the listing cache (see ListingCache.kind), for sorting and filtering"""
+        return self.listing_cache.kind(entry) if self.listing_cache is not None else None
+
+    def _other_filesystem(self, st: os.stat_result) -> bool:
+        """Check if a directory lies on another filesystem than the root (-x)"""
+        return self.root_device is not None and st.st_dev != self.root_device
+
+    def _build_tree(self, directory: Path, prefix: str, depth: int,
+                    visited: Optional[Set[Tuple[int, int]]] = None) -> Tuple[List[str], Optional[str]]:
+        """Generate the tree lines and the Merkle digest of a directory
+
+        The digest is only computed with checksums on, and is None when part
+        of the subtree could not be hashed (depth limit, permissions, loops).
+        """
         if self.max_depth is not None and depth > self.max_depth:
-            return []
+            return [], None
 
-        lines = []
+        if visited is None:
+            visited = set()
+            self._first_visit(directory.stat(), visited)
+            if self.show_last_commit and self.git_manager:
+                self._load_last_commits()
+
+        lines       = []
+        children    = []
+        complete    = True
         try:
-            entries = list(directory.iterdir())
-            entries = [e for e in entries if not self._should_ignore(e)]
-            entries = sort_entries(entries, self.sort_by)
+            entries, hidden, hidden_size = self._select_dir(directory)
+            # Directories known from the listing cache are not stat'ed
+            kinds                        = [self._cached_kind(entry) for entry in entries]
+            stats                        = [None if kind == 'd' else self._entry_stat(entry)
+                                            for entry, kind in zip(entries, kinds)]
 
             # Calculate max length for alignment
             max_len = 0
-            if self.show_permissions or self.show_dates or self.show_git_status or self.show_checksums:
-                for entry in entries:
-                    if entry.is_file():
+            if (self.show_permissions or self.show_dates or self.show_git_status
+                    or self.show_last_commit or self.show_checksums):
+                for entry, st in zip(entries, stats):
+                    if st is not None and stat.S_ISREG(st.st_mode):
                         entry_str = entry.name
                         if self.show_tree_size:
-                            entry_str += f" ({format_size(entry.stat().st_size)})"
+                            entry_str += f" ({format_size(st.st_size)})"
                         max_len = max(max_len, len(entry_str))
 
-            for i, entry in enumerate(entries):
-                is_last             = i == len(entries) - 1
+            for i, (entry, kind, st) in enumerate(zip(entries, kinds, stats)):
+                if self.cancelled:
+                    raise ScanCancelled()
+                is_last             = i == len(entries) - 1 and not hidden
                 current_prefix      = "└── " if is_last else "├── "
-                line                = f"{prefix}{current_prefix}{entry.name}"
+                display_name        = entry.name
+                line                = f"{prefix}{current_prefix}{display_name}"
+
+                if st is None and kind != 'd':
+                    # Vanished since the listing
+                    complete = False
+                    continue
+
+                # Symlinks are shown with their target, and only followed on request
+                if kind != 'd' and self._is_link(entry, st):
+                    target          = os.readlink(entry)
+                    display_name    = f"{entry.name} -> {target}"
+                    line            = f"{prefix}{current_prefix}{display_name}"
+                    if stat.S_ISLNK(st.st_mode):
+                        self.file_count += 1
+                        lines.append(line)
+                        children.append(('l', entry.name, target))
+                        continue
 
-                if entry.is_dir():
+                if kind == 'd' or stat.S_ISDIR(st.st_mode):
                     self.dir_count += 1
                     line += "/"
-                else:
-                    self.file_count += 1
-                    size = entry.stat().st_size
-                    self.total_size += size
-
-                    # Build base line with size
-                    base_line = entry.name
-                    if self.show_tree_size:
-                        base_line += f" ({format_size(size)})"
-
-                    # Calculate padding for alignment
-                    padding     = max_len - len(base_line) if max_len > 0 else 0
-                    line        = f"{prefix}{current_prefix}{base_line}{' ' * padding}"
-
-                    # Add aligned metadata
-                    metadata = []
 
-                    if self.show_permissions:
-                        metadata.append(f"[{get_permissions(entry)}]")
-
-                    if self.show_dates:
-                        metadata.append(f"[{get_file_dates(entry)}]")
-
-                    if self.show_git_status and self.git_manager:
-                        git_status = self.git_manager.get_status(entry)
-                        if git_status:
-                            metadata.append(git_status)
+                    if self._other_filesystem(st):
+                        lines.append(f"{line}  [other filesystem]")
+                        complete = False
+                        continue
 
-                    if self.show_checksums and self.checksum_manager:
-                        checksum = self.checksum_manager.calculate(entry)
-                        if checksum:
-                            metadata.append(f"[{checksum}]")
+                    if not self._first_visit(st, visited):
+                        lines.append(f"{line}  [already listed]")
+                        complete = False
+                        continue
 
-                    if metadata:
-                        line += "  " + " ".join(metadata)
+                    extension               = "    " if is_last else "│   "
+                    sub_lines, sub_digest   = self._build_tree(entry, prefix + extension, depth + 1, visited)
+                    if sub_digest:
+                        line += f"  [{sub_digest[:8]}]"
+                        children.append(('d', entry.name, sub_digest))
+                    else:
+                        complete = False
+
+                    lines.append(line)
+                    lines.extend(sub_lines)
+                    continue
+
+                self.file_count += 1
+
+                # FIFOs, sockets and devices are labelled, never opened
+                kind = file_kind(st.st_mode)
+                if kind:
+                    lines.append(f"{line}  [{kind}]")
+                    children.append(('s', entry.name, kind))
+                    continue
+
+                size = st.st_size
+                self.total_size += size
+
+                # Archives are listed as virtual directories with --archives
+                archive_lines = None
+                if self.archives and is_archive(entry):
+                    extension       = "    " if is_last else "│   "
+                    archive_lines   = self._archive_tree(entry, prefix + extension)
+
+                # Build base line with size
+                base_line = display_name
+                if self.show_tree_size:
+                    base_line += f" ({format_size(size)})"
+
+                # Calculate padding for alignment
+                padding     = max_len - len(base_line) if max_len > 0 else 0
+                line        = f"{prefix}{current_prefix}{base_line}{' ' * padding}"
+
+                # Add aligned metadata
+                metadata = []
+
+                if self.show_permissions:
+                    metadata.append(f"[{get_permissions(entry, st)}]")
+
+                if self.show_dates:
+                    metadata.append(f"[{get_file_dates(entry, st)}]")
+
+                if self.show_git_status and self.git_manager:
+                    git_status = self.git_manager.get_status(entry)
+                    if git_status:
+                        metadata.append(git_status)
+
+                if self.show_last_commit and self.git_manager:
+                    last_commit = self.git_manager.get_last_commit(entry)
+                    if last_commit:
+                        metadata.append(last_commit)
+
+                if self.show_checksums and self.checksum_manager:
+                    checksum = self.checksum_manager.digest(entry, st)
+                    if checksum:
+                        self.checksum_manager.record(checksum, entry, st.st_size)
+                        metadata.append(f"[{checksum[:8]}]")
+                        children.append(('f', entry.name, checksum))
+                    else:
+                        complete = False
+
+                if archive_lines is not None:
+                    metadata.append(archive_lines[0])
+
+                if metadata:
+                    line += "  " + " ".join(metadata)
 
                 lines.append(line)
-
-                if entry.is_dir():
-                    extension = "    " if is_last else "│   "
-                    lines.extend(self.get_tree_structure(entry, prefix + extension, depth + 1))
+                if archive_lines is not None:
+                    lines.extend(archive_lines[1:])
+
+            if hidden:
+                self.hidden_count   += hidden
+                complete            = False
+                size_note           = f" ({format_size(hidden_size)} total size)" if hidden_size is not None else ""
+                if entries:
+                    lines.append(f"{prefix}└── … and {hidden} more{size_note}")
+                else:
+                    lines.append(f"{prefix}└── … {hidden} entries not listed{size_note}")
 
         except PermissionError:
             self.skipped_count += 1
             lines.append(f"{prefix}[Permission denied]")
+            return lines, None
 
-        return lines
+        if not (self.show_checksums and self.checksum_manager) or not complete:
+            return lines, None
+        return lines, self.checksum_manager.directory_digest(children)
 
-    def _should_ignore(self, path: Path) -> bool:
-        """Check if path should be ignored"""
+    def _should_ignore(self, path: Path, kind: Optional[Callable[[Path], Optional[str]]] = None) -> bool:
+        """Check if path should be ignored (`kind` gives entry types without a stat, see kind_is)"""
         include = self.include_only if self.include_only is not None else set()
 
+        if self.output_paths and path in self.output_paths:
+            return True
+
         if should_ignore(path, self.ignore_patterns, self.sensitive_patterns, include):
             return True
 
-        if path.is_file() and self.filter_by_date and not matches_date_filter(path, self.filter_by_date):
+        if (self.filter_by_date and kind_is(path, 'f', kind or self._listed_kind)
+                and not matches_date_filter(path, self.filter_by_date)):
             return True
 
         return False
 
-    def generate_file_contents(self, directory: Path, depth: int = 0) -> None:
-        """Generate content of all files"""
-        if self.max_depth is not None and depth > self.max_depth:
-            return
+    def _archive_tree(self, archive: Path, prefix: str) -> List[str]:
+        """Tree lines of an archive's members, preceded by the label of the archive line
 
+        Members are read from the archive's headers; their data is only read
+        for checksums, and never above --archive-max-member.
+        """
+        from treecatt.features.archive import (
+            ARCHIVE_ERRORS, build_member_tree, iter_member_streams, list_members
+        )
+
+        digests: Dict[str, str] = {}
         try:
-            entries = list(directory.iterdir())
-            entries = [e for e in entries if not self._should_ignore(e)]
-            entries = sort_entries(entries, self.sort_by)
+            if self.show_checksums and self.checksum_manager:
+                members = []
+                for member, stream in iter_member_streams(archive, self.archive_member_limit):
+                    members.append(member)
+                    if stream is not None and not self._member_ignored(archive, member.name):
+                        digest                  = self.checksum_manager.digest_stream(stream, member.size)
+                        digests[member.name]    = digest
+                        self.checksum_manager.record(digest, archive / member.name, member.size)
+            else:
+                members = list_members(archive)
+        except ARCHIVE_ERRORS:
+            return ["[unreadable archive]"]
+
+        members = [m for m in members if not self._member_ignored(archive, m.name)]
+        self.archive_members    += len(members)
+        self.archive_size       += sum(m.size for m in members)
+        return [f"[archive: {len(members)} files]"] + self._member_lines(build_member_tree(members), prefix, digests)
+
+    def _member_lines(self, tree: 'MemberTree', prefix: str, digests: Dict[str, str]) -> List[str]:
+        """Render a virtual directory of archive members like _build_tree does"""
+        from treecatt.features.archive import sort_member_tree
+
+        lines = []
+        items = sort_member_tree(tree, self.sort_by)
+        for i, (name, node) in enumerate(items):
+            is_last         = i == len(items) - 1
+            current_prefix  = "└── " if is_last else "├── "
+
+            if isinstance(node, dict):
+                extension = "    " if is_last else "│   "
+                lines.append(f"{prefix}{current_prefix}{name}/")
+                lines.extend(self._member_lines(node, prefix + extension, digests))
+                continue
+
+            line = f"{prefix}{current_prefix}{name}"
+            if self.show_tree_size:
+                line += f" ({format_size(node.size)})"
+            if node.name in digests:
+                line += f"  [{digests[node.name][:8]}]"
+            elif self.show_checksums and node.size > self.archive_member_limit:
+                line += "  [not read: over member limit]"
+            lines.append(line)
+        return lines
 
-            for entry in entries:
-                if entry.is_dir():
-                    self.generate_file_contents(entry, depth + 1)
+    def _member_ignored(self, archive: Path, name: str) -> bool:
+        """Apply the ignore rules to an archive member and to each of its virtual directories"""
+        parts = name.split('/')
+        for depth in range(1, len(parts)):
+            if should_ignore(archive.joinpath(*parts[:depth]), self.ignore_patterns, self.sensitive_patterns):
+                return True
+        include = self.include_only if self.include_only is not None else set()
+        return should_ignore(archive / name, self.ignore_patterns, self.sensitive_patterns, include)
+
+    def _content_key(self, path: Path, data: Optional[bytes] = None) -> Optional[Tuple[str, str]]:
+        """Key identifying a body: the digest recorded by --checksums, else blake2b of `data`"""
+        recorded = self.checksum_manager.recorded_digest(path) if self.checksum_manager else None
+        if recorded is not None:
+            return (self.checksum_manager.checksum_type, recorded)
+        if data is not None:
+            import hashlib
+            return ('blake2b', hashlib.blake2b(data).hexdigest())
+        return None
+
+    def _identical_marker(self, key: Optional[Tuple[str, str]]) -> Optional[bytes]:
+        first = self.printed_contents.get(key) if key is not None else None
+        return b"[identical to " + first + b"]" if first is not None else None
+
+    def _render_once(self, path: Path, name: bytes, data: bytes) -> bytes:
+        """Render data, or '[identical to <path>]' if the same body was already printed
+
+        Only bodies actually printed are remembered: binary content is not.
+        """
+        key         = self._content_key(path, data)
+        identical   = self._identical_marker(key)
+        if identical is not None:
+            return identical
+        if is_binary_chunk(data[:8192]):
+            return b"[Binary file]"
+        self.printed_contents[key] = name
+        return render_bytes(data, self.show_line_numbers)
+
+    def _deduplicated_bytes(self, path: Path, name: bytes) -> bytes:
+        """File content for --dedupe-content, not reading repeats whose digest is already known"""
+        identical = self._identical_marker(self._content_key(path))
+        if identical is not None:
+            return identical
+        content = load_file_bytes(path, self.max_file_size)
+        if isinstance(content, str):
+            return content.encode()
+        return self._render_once(path, name, content)
+
+    def _write_archive_contents(self, out: BinaryIO, archive: Path) -> None:
+        """Write the contents of an archive's members, streamed without extraction"""
+        from treecatt.features.archive import ARCHIVE_ERRORS, iter_member_streams
+
+        relative_path   = os.fsencode(archive.relative_to(self.root_path))
+        max_size        = min(self.max_file_size, self.archive_member_limit)
+        try:
+            for member, stream in iter_member_streams(archive, max_size):
+                if self._member_ignored(archive, member.name):
+                    continue
+                name = relative_path + b"/" + os.fsencode(member.name)
+                if stream is None:
+                    if self.search_content:
+                        continue
+                    content = f"[File to large: {format_size(member.size)}]".encode()
                 else:
-                    if self.search_content and not search_in_file(entry, self.search_content):
+                    data = stream.read(member.size)
+                    if self.search_content and not content_matches(data, self.search_content):
                         continue
+                    if Path(member.name).suffix.lower() in BINARY_EXTENSIONS:
+                        content = b"[Binary file]"
+                    elif self.dedupe_content:
+                        content = self._render_once(archive / member.name, name, data)
+                    else:
+                        content = render_bytes(data, self.show_line_numbers)
+
+                out.write(b"\nPath: " + name + b"\n" + CONTENT_RULE + b"\n")
+                out.write(content)
+                out.write(b"\n" + END_OF_FILE_RULE + b"\n")
+        except ARCHIVE_ERRORS as e:
+            out.write(b"\nPath: " + relative_path + b"\n" + CONTENT_RULE + b"\n")
+            out.write(f"[Unreadable archive: {e}]".encode())
+            out.write(b"\n" + END_OF_FILE_RULE + b"\n")
+
+    def _load_last_commits(self) -> None:
+        """Resolve last commits for every file the tree can display, in one git log pass"""
+        if self.changed_children is not None:
+            self.git_manager.load_last_commits(str(p.relative_to(self.root_path)) for p in self.iter_files())
+            return
+        index = self.build_index()
+        self.git_manager.load_last_commits(index.relpath(i) for i in index.iter_files())
+
+    def build_index(self) -> 'TreeIndex':
+        """Scan the tree into a compact columnar index (same filters as the tree)"""
+        from treecatt.features.index import TreeIndex
+        return TreeIndex.scan(self.root_path, self._should_ignore, self.max_depth,
+                              self.follow_symlinks, self.one_file_system)
+
+    def find_near_duplicates(self, detector: Optional['NearDuplicateDetector'] = None) -> 'NearDuplicateDetector':
+        """Shingle every displayed text file into a (new or shared) near-duplicate detector"""
+        if detector is None:
+            from treecatt.features.similarity import NearDuplicateDetector
+            detector = NearDuplicateDetector(self.near_duplicates)
+        for entry in self.iter_files():
+            content = read_text_bytes(entry, self.max_file_size)
+            if content:
+                detector.add(entry, content)
+        return detector
+
+    @staticmethod
+    def _group_paths(paths: Set[str]) -> Dict[str, Set[str]]:
+        """Index relative file paths by parent directory, creating every ancestor"""
+        children: Dict[str, Set[str]] = {}
+        for path in paths:
+            parts = Path(path).parts
+            for depth in range(len(parts)):
+                parent = os.path.join(*parts[:depth]) if depth else '.'
+                children.setdefault(parent, set()).add(parts[depth])
+        return children
+
+    def _list_dir(self, directory: Path) -> List[Path]:
+        """List a directory, dropping ignored entries and applying the sort order
+
+        With --since, only changed paths are listed, without reading the directory.
+        """
+        kinds: Optional[Dict[str, str]] = None
+        if self.changed_children is not None:
+            relative    = os.path.relpath(directory, self.root_path)
+            names       = [name for name in self.changed_children.get(relative, ())
+                           if os.path.lexists(directory / name)]
+        elif self.listing_cache is not None:
+            names = self.listing_cache.list(directory)
+        else:
+            # Entry types from d_type: sorting and filtering need no stat
+            with os.scandir(directory) as it:
+                kinds = {entry.name: entry_kind(entry) for entry in it}
+            names = list(kinds)
+        kind    = (lambda path: kinds.get(path.name)) if kinds is not None else self._listed_kind
+        entries = [directory / name for name in names]
+        entries = [e for e in entries if not self._should_ignore(e, kind)]
+        return sort_entries(entries, self.sort_by, kind)
+
+    def _list_dir_raw(self, directory: Path) -> List[Path]:
+        """List a directory for --compare: only the explicit --ignore/--include apply
+
+        Default and sensitive patterns are for display; a replica must match
+        on README.md, keys and build outputs too.
+        """
+        names   = self.listing_cache.list(directory) if self.listing_cache is not None else os.listdir(directory)
+        include = self.include_only if self.include_only is not None else set()
+        entries = [directory / name for name in names]
+        return [e for e in entries if not should_ignore(e, self.user_ignore_patterns, set(), include)]
 
-                    relative_path = entry.relative_to(self.root_path)
-                    content = read_file_content(entry, self.max_file_size, 
-                                               self.show_line_numbers, self.search_content)
+    def _select_dir(self, directory: Path) -> Tuple[List[Path], int, Optional[int]]:
+        """Entries to display, plus how many were left out (and their size with --tree-size)
 
-                    print(f"\nPath: {relative_path}")
-                    print("─" * 70)
-                    print(content)
-                    print("─" * 27 + "END OF FILE" + "─" * 32)
+        Without --max-entries/--count-above this is _list_dir(). Otherwise
+        only the shown entries are turned into Paths: the top N are picked
+        with a heap from scandir data, and hidden entries are only stat'ed
+        when their total size is displayed.
+        """
+        if self.max_entries is None and self.count_above is None:
+            return self._list_dir(directory), 0, None
+
+        if self.changed_children is not None:
+            # Changed paths are few: plain slicing of the sorted list
+            entries = self._list_dir(directory)
+            if self.count_above is not None and len(entries) > self.count_above:
+                return [], len(entries), None
+            shown = entries[:self.max_entries] if self.max_entries is not None else entries
+            return shown, len(entries) - len(shown), None
+
+        with os.scandir(directory) as it:
+            candidates = [e for e in it if not self._should_ignore(Path(e.path))]
+
+        if self.count_above is not None and len(candidates) > self.count_above:
+            return [], len(candidates), self._total_size(candidates)
+
+        if self.max_entries is None or len(candidates) <= self.max_entries:
+            return sort_entries([Path(e.path) for e in candidates], self.sort_by), 0, None
+
+        shown       = select_entries(candidates, self.sort_by, self.max_entries)
+        shown_ids   = {id(e) for e in shown}
+        hidden      = [e for e in candidates if id(e) not in shown_ids]
+        return [Path(e.path) for e in shown], len(hidden), self._total_size(hidden)
+
+    def _total_size(self, entries: List[os.DirEntry]) -> Optional[int]:
+        """Total size of the files among entries, only when sizes are displayed"""
+        if not self.show_tree_size:
+            return None
+        total = 0
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    total += entry.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def iter_files(self, directory: Optional[Path] = None, depth: int = 0,
+                   visited: Optional[Set[Tuple[int, int]]] = None) -> Iterator[Path]:
+        """Yield the regular files whose contents are displayed, in tree order"""
+        if directory is None:
+            directory = self.root_path
+        if self.max_depth is not None and depth > self.max_depth:
+            return
+        if visited is None:
+            visited = set()
+            self._first_visit(directory.stat(), visited)
 
+        try:
+            entries = self._select_dir(directory)[0]
         except PermissionError:
-            pass
+            return
 
-    def run(self) -> int:
-        """Execute TreeCatt"""
+        for entry in entries:
+            kind = self._cached_kind(entry)
+            if kind is None:
+                st = self._entry_stat(entry)
+                if st is None:
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    if not self._other_filesystem(st) and self._first_visit(st, visited):
+                        yield from self.iter_files(entry, depth + 1, visited)
+                    continue
+                kind = 'f' if stat.S_ISREG(st.st_mode) else 'o'
+            elif kind == 'd':
+                yield from self.iter_files(entry, depth + 1, visited)
+                continue
+
+            if kind != 'f':
+                # Unfollowed or dangling links, FIFOs, sockets, devices
+                continue
+            elif (self.search_content and not (self.archives and is_archive(entry))
+                    and not search_in_file(entry, self.search_content)):
+                # Archives are searched member by member
+                continue
+            else:
+                yield entry
+
+    def generate_file_contents(self, directory: Optional[Path] = None, depth: int = 0) -> None:
+        """Generate content of all files, written as raw bytes"""
+        out = binary_stdout()
+        try:
+            for entry in self.iter_files(directory, depth):
+                if self.archives and is_archive(entry):
+                    self._write_archive_contents(out, entry)
+                    continue
+
+                relative_path   = os.fsencode(entry.relative_to(self.root_path))
+                if self.dedupe_content:
+                    content = self._deduplicated_bytes(entry, relative_path)
+                else:
+                    content = read_file_bytes(entry, self.max_file_size, self.show_line_numbers)
+
+                out.write(b"\nPath: " + relative_path + b"\n" + CONTENT_RULE + b"\n")
+                out.write(content)
+                out.write(b"\n" + END_OF_FILE_RULE + b"\n")
+        finally:
+            out.flush()
+
+    def _save_caches(self) -> None:
+        """Persist the digest and scan caches that were requested"""
+        if self.checksum_manager and self.checksum_cache:
+            try:
+                self.checksum_manager.save_cache(self.checksum_cache)
+            except OSError as e:
+                print(f"Warning: could not save checksum cache: {e}", file=sys.stderr)
+        if self.listing_cache is not None and self.scan_cache:
+            try:
+                self.listing_cache.save(self.scan_cache)
+            except OSError as e:
+                print(f"Warning: could not save scan cache: {e}", file=sys.stderr)
+
+    def compare(self, other_path: str) -> int:
+        """Compare the tree with another one: 0 if identical, 1 if different, 2 on error"""
+        other_root = Path(other_path).resolve()
+        for path in (self.root_path, other_root):
+            if not path.is_dir():
+                print(f"Error: '{path}' is not a directory.", file=sys.stderr)
+                return 2
+
+        from treecatt.features.checksum import ChecksumManager
+        from treecatt.features.compare import TreeComparer
+
+        manager     = self.checksum_manager or ChecksumManager()
+        comparer    = TreeComparer(manager, self._list_dir_raw, self.follow_symlinks)
+        comparer.compare(self.root_path, other_root)
+        comparer.print_differences(self.root_path, other_root)
+        self._save_caches()
+
+        return 1 if comparer.differences else 0
+
+    def cancel(self) -> None:
+        """Make a scan running in another thread stop at the next entry (raising ScanCancelled)"""
+        self.cancelled = True
+
+    def check_root(self) -> bool:
+        """Check that the root is an existing directory, reporting the error if not"""
         if not self.root_path.exists():
             print(f"Error: Path '{self.root_path}' does not exist.", file=sys.stderr)
-            return 1
+            return False
 
         if not self.root_path.is_dir():
             print(f"Error: '{self.root_path}' is not a directory.", file=sys.stderr)
-            return 1
+            return False
+        return True
 
-        print(f"\nTreeCatt v{VERSION}")
-        print(f"Analyzing: {self.root_path}\n")
+    def scan(self) -> None:
+        """Build the tree (and digests); prints nothing, so roots can be scanned concurrently"""
+        self.tree_lines, self.root_digest = self._build_tree(self.root_path, "", 0)
 
-        # Display tree
-        print(f"{self.root_path.name}/")
-        tree_lines = self.get_tree_structure(self.root_path)
-        for line in tree_lines:
+    def print_tree(self) -> None:
+        """Print the scanned tree and its statistics"""
+        print(f"Analyzing: {self.root_path}\n")
+        print(f"{self.root_path.name}/" + (f"  [{self.root_digest[:8]}]" if self.root_digest else ""))
+        for line in self.tree_lines:
             print(line)
 
         print(f"\nStatistics:")
@@ -221,158 +1062,172 @@ class TreeCatt:
         print(f"  - Total size: {format_size(self.total_size)}")
         if self.skipped_count > 0:
             print(f"  - {self.skipped_count} items skipped (permissions)")
+        if self.hidden_count > 0:
+            print(f"  - {self.hidden_count} entries not listed (entry limits)")
+        if self.archive_members > 0:
+            print(f"  - {self.archive_members} files inside archives ({format_size(self.archive_size)} uncompressed)")
 
-        # Display duplicates
-        if self.show_duplicates and self.checksum_manager:
-            self.checksum_manager.print_duplicates(self.root_path)
-
-        # Display file contents if requested
+    def print_contents(self) -> None:
+        """Print the contents of the displayed files, unless only the tree is wanted"""
         if not self.show_tree:
             print(f"\nFile contents:\n")
             print("=" * 70)
             self.generate_file_contents(self.root_path)
 
-        return 0
-
-
-def main() -> int:
-    parser = argparse.ArgumentParser(
-        description         = 'TreeCatt - Display directory tree and file contents',
-        formatter_class     = argparse.RawDescriptionHelpFormatter,
-        epilog              = """
-Examples:
-USAGE EXAMPLES — COMPLETE REFERENCE
-==================================
-
-BASIC USAGE
------------
-  treecatt
-      Run full analysis on the current directory with default settings.
-
-  treecatt /var/www
-      Run full analysis on a specific path.
-
-
-TREE DISPLAY MODES
-------------------
-  treecatt --tree
-      Display only the directory tree (no file contents).
-
-  treecatt --tree --depth 3
-      Display the tree up to a maximum depth of 3 levels.
-
-  treecatt --tree --tree-size
-      Display file sizes next to each file in the tree.
-
-  treecatt --tree --permissions
-      Display Unix permissions in the tree output.
-
-  treecatt --tree --dates
-      Display last modification dates in the tree.
-
-  treecatt --tree --git-status
-      Display Git status (modified, untracked, ignored) in the tree.
-
-  treecatt --tree --tree-size --permissions --dates --git-status
-      Full detailed tree view with all available metadata.
-
-
-FILTERING FILES
----------------
-  treecatt --ignore "*.log" "*.tmp" "__pycache__"
-      Ignore additional file or directory patterns.
-
-  treecatt --no-default-ignore
-      Disable built-in ignore rules (e.g. .git, node_modules).
-
-  treecatt --include "*.py" "*.md"
-      Include only files matching these patterns.
+    def run(self) -> int:
+        """Execute TreeCatt"""
+        if not self.check_root():
+            return 1
 
-  treecatt --filter-date 24h
-      Show only files modified in the last 24 hours.
+        print(f"\nTreeCatt v{VERSION}")
+        self.scan()
+        self.print_tree()
+        print_reports([self], self.root_path)
+
+        # Write the bundle instead of printing contents
+        if self.bundle_path:
+            from treecatt.features.bundle import BundleWriter
+            writer = BundleWriter(self.bundle_path, self.max_file_size, self.checksum_manager)
+            writer.write(self.root_path, self.tree_lines, self.iter_files())
+            print(f"\nBundle written: {self.bundle_path} ({writer.file_count} files, {format_size(writer.total_bytes)})")
+            print(f"Index written: {writer.index_path}")
+            self._save_caches()
+            return 0
+
+        self.print_contents()
+        self._save_caches()
+        return 0
 
-  treecatt --filter-date 7d
-      Show only files modified in the last 7 days.
 
-  treecatt --max-size 1MB
-      Exclude files larger than the specified size.
+def print_reports(treecatts: List[TreeCatt], root_path: Path) -> None:
+    """Print the reports spanning every scanned root: line statistics and (near-)duplicates
 
-  treecatt --max-size 500KB
-      Exclude files larger than 500 KB.
+    Paths are shown relative to root_path, a common parent of the roots.
+    """
+    first = treecatts[0]
 
+    # Display line statistics per language
+    if first.stats_lines:
+        from treecatt.features.linestats import LineStats
+        stats = LineStats()
+        for treecatt in treecatts:
+            stats.collect(treecatt.iter_files())
+        stats.print_report()
 
-FILE CONTENT DISPLAY
---------------------
-  treecatt --view .env config.yaml secrets.json
-      Force display of sensitive or normally hidden files.
+    # Display duplicates (the checksum manager is shared by all roots)
+    if first.show_duplicates and first.checksum_manager:
+        first.checksum_manager.print_duplicates(root_path)
 
-  treecatt --line-numbers
-      Display line numbers when showing file contents.
+    # Display near-duplicates
+    if first.near_duplicates is not None:
+        detector = None
+        for treecatt in treecatts:
+            detector = treecatt.find_near_duplicates(detector)
+        detector.print_near_duplicates(root_path)
 
 
-ANALYSIS FEATURES
------------------
-  treecatt --checksums md5
-      Calculate MD5 checksums for all files.
+def run_roots(treecatts: List[TreeCatt]) -> int:
+    """Scan several roots concurrently, then print them in order
 
-  treecatt --checksums sha256
-      Calculate SHA-256 checksums for all files.
-
-  treecatt --checksums sha256 --duplicates
-      Detect duplicate files using cryptographic hashes.
-
-
-SEARCH
-------
-  treecatt --search "TODO"
-      Search for a text pattern inside all analyzed files.
-
-  treecatt --search "password"
-      Search for potentially sensitive keywords.
+    The TreeCatt instances share their checksum manager and listing cache
+    (see run_cli), so duplicates are detected across roots.
+    """
+    if not all([treecatt.check_root() for treecatt in treecatts]):
+        return 1
 
+    from concurrent.futures import ThreadPoolExecutor
+    executor = ThreadPoolExecutor(min(32, len(treecatts)))
+    try:
+        for future in [executor.submit(treecatt.scan) for treecatt in treecatts]:
+            future.result()
+    except KeyboardInterrupt:
+        # Stop the other scans before the interrupt propagates (e.g. to save a checkpoint)
+        for treecatt in treecatts:
+            treecatt.cancel()
+        executor.shutdown(wait=True)
+        raise
+    executor.shutdown()
+    if treecatts[0].checksum_manager:
+        treecatts[0].checksum_manager.order_by_roots([treecatt.root_path for treecatt in treecatts])
+
+    print(f"\nTreeCatt v{VERSION}")
+    for treecatt in treecatts:
+        treecatt.print_tree()
+        print()
+
+    common_root = Path(os.path.commonpath([str(treecatt.root_path) for treecatt in treecatts]))
+    print_reports(treecatts, common_root)
+
+    for treecatt in treecatts:
+        treecatt.print_contents()
+
+    # Shared caches are owned and saved by the first root
+    treecatts[0]._save_caches()
+    return 0
+
+
+def parse_size(text: str) -> int:
+    """Parse a size such as 500KB, 1MB or 2GB into bytes (ValueError if invalid)"""
+    size        = text.upper()
+    multiplier  = 1
+    if size.endswith('KB'):
+        multiplier  = 1024
+        size        = size[:-2]
+    elif size.endswith('MB'):
+        multiplier  = 1024 * 1024
+        size        = size[:-2]
+    elif size.endswith('GB'):
+        multiplier  = 1024 * 1024 * 1024
+        size        = size[:-2]
+    return int(float(size) * multiplier)
 
-SORTING
--------
-  treecatt --sort name
-      Sort files alphabetically (default).
 
-  treecatt --sort size
-      Sort files by size.
+def serve_main(argv: List[str]) -> int:
+    """treecatt serve: answer CLI requests from a warm in-memory state"""
+    from treecatt.features.daemon import DEFAULT_GIT_TTL, WarmState, serve
 
-  treecatt --sort date
-      Sort files by modification date.
+    parser = argparse.ArgumentParser(
+        prog                = 'treecatt serve',
+        description         = 'Run a TreeCatt server; treecatt commands use it automatically while it runs',
+    )
+    parser.add_argument('--socket', default=default_socket_path(),
+                       help='Unix socket path (default: $TREECATT_SOCKET or the runtime dir)')
+    parser.add_argument('--git-ttl', type=float, default=DEFAULT_GIT_TTL, metavar='SECONDS',
+                       help=f'Max age of cached git status (default: {DEFAULT_GIT_TTL})')
+    args = parser.parse_args(argv)
 
-  treecatt --sort ext
-      Sort files by file extension.
+    state = WarmState(args.git_ttl)
+    return serve(args.socket, lambda request_argv: run_cli(request_argv, state))
 
 
-COMBINED REAL-WORLD EXAMPLES
-----------------------------
-  treecatt --tree --depth 4 --include "*.py" --sort size
-      Show a Python project tree, limited to 4 levels, sorted by file size.
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point: use a running server when there is one, else run locally"""
+    argv = sys.argv[1:] if argv is None else argv
 
-  treecatt --search "FIXME" --filter-date 2w
-      Search for recent FIXME comments from the last 2 weeks.
+    if argv[:1] == ['serve']:
+        return serve_main(argv[1:])
 
-  treecatt --checksums sha1 --duplicates --max-size 5MB
-      Find duplicate files smaller than 5 MB using SHA-1 hashes.
-
-  treecatt --tree --git-status --ignore node_modules dist
-      Show project tree while ignoring build artifacts.
+    if not os.environ.get('TREECATT_NO_DAEMON'):
+        socket_path = default_socket_path()
+        if os.path.exists(socket_path):
+            from treecatt.features.daemon import run_client
+            code = run_client(argv, socket_path)
+            if code is not None:
+                return code
 
-  treecatt --view .env --line-numbers --search "API_KEY"
-      Inspect environment files and search for API keys.
+    return run_cli(argv)
 
 
-MISC
-----
-  treecatt --version
-      Display TreeCatt version information.
-        """
+def run_cli(argv: List[str], state: Optional['WarmState'] = None) -> int:
+    """Parse arguments and run TreeCatt in this process"""
+    parser = argparse.ArgumentParser(
+        description         = 'TreeCatt - Display directory tree and file contents',
+        formatter_class     = argparse.RawDescriptionHelpFormatter,
+        epilog              = HELP_EPILOG if {"-h", "--help"} & set(argv) else None
     )
 
-    parser.add_argument('path', nargs='?', default=os.getcwd(), 
-                       help='Path to analyze (default: .)')
+    parser.add_argument('path', nargs='*',
+                       help='Paths to analyze, scanned concurrently (default: .)')
 
     parser.add_argument('--ignore', '-i', nargs='+', metavar='PATTERN',
                        help='Additional patterns to ignore')
@@ -398,12 +1253,37 @@ MISC
     parser.add_argument('--dates', action='store_true',
                        help='Show modification dates')
 
-    parser.add_argument('--checksums', choices=['md5', 'sha1', 'sha256'],
-                       help='Calculate checksums')
+    parser.add_argument('--checksums', choices=['md5', 'sha1', 'sha256', 'git'],
+                       help='Calculate checksums (git: blob IDs, read from the index for clean files)')
 
     parser.add_argument('--duplicates', action='store_true',
                        help='Detect duplicate files')
 
+    parser.add_argument('--scan-cache', metavar='FILE',
+                       help='Persist directory listings in FILE, reused while a directory is unchanged')
+
+    parser.add_argument('--checkpoint', metavar='FILE',
+                       help='Save scan progress (digests, listings) to FILE periodically and on ^C; removed on success')
+
+    parser.add_argument('--resume', action='store_true',
+                       help='Resume from the --checkpoint FILE of an interrupted run')
+
+    parser.add_argument('--checksum-cache', metavar='FILE',
+                       help='Persist file digests, reused while size and mtime are unchanged')
+
+    parser.add_argument('--compare', nargs=2, metavar=('A', 'B'),
+                       help='Compare two trees and print only the differences '
+                            '(default ignores do not apply, only --ignore/--include)')
+
+    parser.add_argument('--stats-lines', action='store_true',
+                       help='Report files, lines, blank lines and size per language')
+
+    parser.add_argument('--near-duplicates', action='store_true',
+                       help='Detect near-duplicate text files')
+
+    parser.add_argument('--near-threshold', type=float, default=0.8, metavar='THRESHOLD',
+                       help='Similarity for --near-duplicates (default: 0.8)')
+
     parser.add_argument('--search', metavar='PATTERN',
                        help='Search pattern in files')
 
@@ -419,62 +1299,208 @@ MISC
     parser.add_argument('--depth', '-d', type=int,
                        help='Maximum tree depth')
 
+    parser.add_argument('--max-entries', type=int, metavar='N',
+                       help='Show at most N entries per directory')
+
+    parser.add_argument('--count-above', type=int, metavar='N',
+                       help='Only count entries of directories with more than N entries')
+
     parser.add_argument('--include', nargs='+', metavar='PATTERN',
                        help='Include only matching files')
 
     parser.add_argument('--no-default-ignore', action='store_true',
                        help='Disable default ignores')
 
+    parser.add_argument('--follow-symlinks', '-L', action='store_true',
+                       help='Follow symlinks (each directory is scanned at most once)')
+
+    parser.add_argument('--last-commit', action='store_true',
+                       help='Show the last commit (hash, date, author) of each file')
+
+    parser.add_argument('--gentle', action='store_true',
+                       help='Low-impact I/O: rate-limit reads, drop read files from the page cache, lower priority')
+
+    parser.add_argument('--io-limit', metavar='RATE',
+                       help='Bytes read per second in gentle mode, e.g. 5MB (default: 10MB)')
+
+    parser.add_argument('--files-limit', type=float, metavar='N',
+                       help='Files opened per second in gentle mode (default: 200)')
+
+    parser.add_argument('--dedupe-content', action='store_true',
+                       help='Print each distinct file content once; repeats show [identical to <path>]')
+
+    parser.add_argument('--since', metavar='REF',
+                       help='Only show files changed since a git revision (plus uncommitted and untracked files)')
+
+    parser.add_argument('--archives', action='store_true',
+                       help='Show zip/jar/war/whl and tar(.gz/.bz2/.xz) archives as directories, without extracting')
+
+    parser.add_argument('--archive-max-member', default='64MB', metavar='SIZE',
+                       help='Never read archive members larger than SIZE (default: 64MB)')
+
+    parser.add_argument('--one-file-system', '-x', action='store_true',
+                       help='Do not descend into directories on other filesystems')
+
+    parser.add_argument('--bundle', metavar='OUT',
+                       help='Write tree and raw file contents to a bundle file (+ OUT.idx index)')
+
     parser.add_argument('--version', action='version', version=f'TreeCatt {VERSION}')
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Validation
-    if args.duplicates and not args.checksums:
+    if (args.duplicates or args.compare or args.checksum_cache) and not args.checksums:
         args.checksums = 'md5'
 
-    # Convert max size
-    max_size    = args.max_size.upper()
-    multiplier  = 1
-    if max_size.endswith('KB'):
-        multiplier  = 1024
-        max_size    = max_size[:-2]
-    elif max_size.endswith('MB'):
-        multiplier  = 1024 * 1024
-        max_size    = max_size[:-2]
-    elif max_size.endswith('GB'):
-        multiplier  = 1024 * 1024 * 1024
-        max_size    = max_size[:-2]
+    if args.resume and not args.checkpoint:
+        print("Error: --resume needs --checkpoint FILE", file=sys.stderr)
+        return 1
+
+    if args.since and args.compare:
+        print("Error: --since cannot be combined with --compare", file=sys.stderr)
+        return 1
+
+    if len(args.path) > 1 and (args.compare or args.bundle):
+        print("Error: --compare and --bundle take a single path", file=sys.stderr)
+        return 1
 
+    if args.near_duplicates and not 0 < args.near_threshold <= 1:
+        print(f"Error: Invalid threshold '{args.near_threshold}' (expected 0 < THRESHOLD <= 1)", file=sys.stderr)
+        return 1
+
+    # Convert max size
     try:
-        max_file_size = int(float(max_size) * multiplier)
+        max_file_size = parse_size(args.max_size)
     except ValueError:
         print(f"Error: Invalid size '{args.max_size}'", file=sys.stderr)
         return 1
+
+    try:
+        archive_member_limit = parse_size(args.archive_max_member)
+    except ValueError:
+        print(f"Error: Invalid size '{args.archive_max_member}'", file=sys.stderr)
+        return 1
+
+    # Low-impact I/O: --io-limit and --files-limit imply --gentle
+    io_throttle = None
+    if args.gentle or args.io_limit or args.files_limit:
+        from treecatt.features.throttle import DEFAULT_FILES_LIMIT, DEFAULT_IO_LIMIT, IOThrottle
+        try:
+            io_limit = parse_size(args.io_limit) if args.io_limit else DEFAULT_IO_LIMIT
+        except ValueError:
+            print(f"Error: Invalid size '{args.io_limit}'", file=sys.stderr)
+            return 1
+        files_limit = args.files_limit or DEFAULT_FILES_LIMIT
+        if io_limit <= 0 or files_limit <= 0:
+            print("Error: --io-limit and --files-limit must be positive", file=sys.stderr)
+            return 1
+        io_throttle = IOThrottle(io_limit, files_limit)
+        if state is None:
+            # Never renice a long-lived server
+            io_throttle.lower_priority()
     
-    treecatt = TreeCatt(
-        root_path               = args.path,
-        ignore_patterns         = args.ignore,
-        view_sensitive          = args.view,
-        max_file_size           = max_file_size,
-        show_tree               = args.tree,
-        show_tree_size          = args.tree_size,
-        show_line_numbers       = args.line_numbers,
-        show_git_status         = args.git_status,
-        show_permissions        = args.permissions,
-        show_dates              = args.dates,
-        show_checksums          = bool(args.checksums),
-        checksum_type           = args.checksums or 'md5',
-        filter_by_date          = args.filter_date,
-        search_content          = args.search,
-        show_duplicates         = args.duplicates,
-        sort_by                 = args.sort,
-        max_depth               = args.depth,
-        include_only            = args.include,
-        no_default_ignore       = args.no_default_ignore
-    )
+    roots                       = [args.compare[0]] if args.compare else (args.path or [os.getcwd()])
+    treecatts: List[TreeCatt]   = []
+    for root in roots:
+        first = treecatts[0] if treecatts else None
+        treecatts.append(TreeCatt(
+            root_path               = root,
+            ignore_patterns         = args.ignore,
+            view_sensitive          = args.view,
+            max_file_size           = max_file_size,
+            show_tree               = args.tree,
+            show_tree_size          = args.tree_size,
+            show_line_numbers       = args.line_numbers,
+            show_git_status         = args.git_status,
+            show_last_commit        = args.last_commit,
+            show_permissions        = args.permissions,
+            show_dates              = args.dates,
+            show_checksums          = bool(args.checksums),
+            checksum_type           = args.checksums or 'md5',
+            filter_by_date          = args.filter_date,
+            search_content          = args.search,
+            show_duplicates         = args.duplicates,
+            near_duplicates         = args.near_threshold if args.near_duplicates else None,
+            stats_lines             = args.stats_lines,
+            sort_by                 = args.sort,
+            max_depth               = args.depth,
+            include_only            = args.include,
+            no_default_ignore       = args.no_default_ignore,
+            bundle_path             = args.bundle,
+            # Caches are loaded and saved by the first root, and shared by the others
+            checksum_cache          = None if first else args.checksum_cache,
+            scan_cache              = None if first else args.scan_cache,
+            checkpoint_path         = args.checkpoint,
+            checksum_manager        = first.checksum_manager if first else None,
+            listing_cache           = first.listing_cache if first else None,
+            follow_symlinks         = args.follow_symlinks,
+            max_entries             = args.max_entries,
+            count_above             = args.count_above,
+            one_file_system         = args.one_file_system,
+            archives                = args.archives,
+            since                   = args.since,
+            dedupe_content          = args.dedupe_content,
+            archive_member_limit    = archive_member_limit,
+            state                   = state
+        ))
+
+    for treecatt in treecatts:
+        if args.since and treecatt.changed_children is None:
+            print(f"Error: cannot list changes since '{args.since}' in {treecatt.root_path} "
+                  f"(not a git repository, or unknown revision)", file=sys.stderr)
+            return 1
+
+    def execute() -> int:
+        if args.compare:
+            return treecatts[0].compare(args.compare[1])
+        if len(treecatts) > 1:
+            return run_roots(treecatts)
+        return treecatts[0].run()
+
+    checkpoint = None
+    if args.checkpoint:
+        from treecatt.features.checkpoint import Checkpoint
+        first       = treecatts[0]
+        checkpoint  = Checkpoint(args.checkpoint, [treecatt.root_path for treecatt in treecatts],
+                                 first.checksum_manager, first.listing_cache)
+        if args.resume and not checkpoint.load():
+            print(f"Warning: no usable checkpoint in {args.checkpoint}, starting over", file=sys.stderr)
+        try:
+            checkpoint.start()
+        except OSError as e:
+            print(f"Error: cannot write checkpoint {args.checkpoint}: {e}", file=sys.stderr)
+            return 1
 
-    return treecatt.run()
+    def execute_checkpointed() -> int:
+        if checkpoint is None:
+            return execute()
+        try:
+            code = execute()
+        except KeyboardInterrupt:
+            try:
+                checkpoint.stop()
+            except OSError as e:
+                print(f"\nInterrupted; could not save checkpoint: {e}", file=sys.stderr)
+                return 130
+            print(f"\nInterrupted; progress saved to {checkpoint.path} (rerun with --resume)", file=sys.stderr)
+            return 130
+        except BaseException:
+            checkpoint.stop()
+            raise
+        checkpoint.stop()
+        checkpoint.remove()
+        return code
+
+    if io_throttle is None:
+        return execute_checkpointed()
+
+    set_io_throttle(io_throttle)
+    try:
+        return execute_checkpointed()
+    finally:
+        set_io_throttle(None)
+        io_throttle.finish()
+        io_throttle.print_report()
 
 
 if __name__ == '__main__':
@@ -2,12 +2,25 @@
 Unit tests for TreeCatt
 """
 
+import os
+import shutil
 import pytest
 import tempfile
 from pathlib import Path
-from typing import Generator
+from typing import Generator, List
 from treecatt.main import TreeCatt
-from treecatt.features import format_size, get_permissions, should_ignore, sort_entries
+from treecatt.features import (
+    format_size, get_permissions, should_ignore, sort_entries,
+    TreeIndex, ChecksumManager, TreeComparer
+)
+
+
+def age_tree(root: Path) -> None:
+    """Backdate every entry under root, so its listings and digests are not racy"""
+    for directory, dirs, files in os.walk(root):
+        for name in files + dirs:
+            os.utime(os.path.join(directory, name), (1_000_000_000, 1_000_000_000))
+    os.utime(root, (1_000_000_000, 1_000_000_000))
 
 
 class TestTreeCatt:
@@ -197,5 +210,1115 @@ class TestFeatures:
         assert len(sorted_entries) == 3
 
 
+class TestByteOutput:
+    """Test the bytes-native content renderer"""
+
+    def test_read_file_bytes_line_numbers(self, tmp_path: Path) -> None:
+        """Line numbering keeps non-UTF-8 bytes intact"""
+        from treecatt.features import read_file_bytes
+
+        target = tmp_path / "latin.txt"
+        target.write_bytes(b"caf\xe9\nok")
+        assert read_file_bytes(target, 1024) == b"caf\xe9\nok"
+        assert read_file_bytes(target, 1024, True) == b"   1 | caf\xe9\n   2 | ok"
+        assert read_file_bytes(target, 2).startswith(b"[File to large")
+
+    def test_contents_written_byte_exact(self, tmp_path: Path, capfdbinary) -> None:
+        """File contents reach stdout without a decode/encode round trip"""
+        (tmp_path / "data.py").write_bytes(b"x = '\xfe'\n")
+        tc = TreeCatt(str(tmp_path))
+        tc.generate_file_contents()
+
+        out = capfdbinary.readouterr().out
+        assert b"Path: data.py\n" in out
+        assert b"x = '\xfe'\n" in out
+
+    def test_search_non_ascii_pattern(self, tmp_path: Path) -> None:
+        """Case-insensitive search still works for non-ASCII patterns"""
+        from treecatt.features import search_in_file
+
+        target = tmp_path / "notes.txt"
+        target.write_text("Ça marche\n", encoding="utf-8")
+        assert search_in_file(target, "ça")
+        assert search_in_file(target, "MARCHE")
+
+
+class TestEntryLimits:
+    """Test per-directory entry caps"""
+
+    @pytest.fixture
+    def crowded(self, tmp_path: Path) -> Path:
+        (tmp_path / "zdir").mkdir()
+        for i in range(20):
+            (tmp_path / f"file{i:02d}.py").write_text("x" * (i + 1))
+        return tmp_path
+
+    def test_max_entries_summary(self, crowded: Path) -> None:
+        """Only N entries are shown, followed by a summary of the rest"""
+        tc      = TreeCatt(str(crowded), max_entries=3, show_tree_size=True)
+        lines   = tc.get_tree_structure(crowded)
+
+        assert lines[0] == "├── zdir/"
+        assert lines[1].startswith("├── file00.py")
+        assert lines[-1] == f"└── … and 18 more ({format_size(sum(range(3, 21)))} total size)"
+        assert tc.hidden_count == 18
+        assert [p.name for p in tc.iter_files()] == ["file00.py", "file01.py"]
+
+    def test_select_entries_matches_sort(self, crowded: Path) -> None:
+        """Heap selection returns the head of the full sort order"""
+        import os
+        from treecatt.features import select_entries
+
+        for sort_by in ("name", "size", "ext"):
+            with os.scandir(crowded) as it:
+                selected = [e.name for e in select_entries(list(it), sort_by, 5)]
+            expected = [p.name for p in sort_entries(list(crowded.iterdir()), sort_by)[:5]]
+            assert selected == expected
+
+    def test_hidden_entries_not_stated(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Only the shown entries are stat'ed, in the tree and the content passes"""
+        for i in range(2000):
+            (tmp_path / f"file{i:04d}.py").write_text("x")
+
+        calls   = []
+        real    = os.stat
+        monkeypatch.setattr(os, "stat", lambda *a, **k: calls.append(a[0]) or real(*a, **k))
+
+        tc = TreeCatt(str(tmp_path), max_entries=5)
+        tc.get_tree_structure(tmp_path)
+        assert len(calls) < 20
+        calls.clear()
+        assert len(list(tc.iter_files())) == 5
+        assert len(calls) < 20
+
+    def test_count_above(self, crowded: Path) -> None:
+        """Directories above the threshold are only counted"""
+        tc      = TreeCatt(str(crowded), count_above=10)
+        lines   = tc.get_tree_structure(crowded)
+        assert lines == ["└── … 21 entries not listed"]
+
+
+class TestSymlinks:
+    """Test symlink display and loop-safe traversal"""
+
+    @pytest.fixture
+    def linked_tree(self, tmp_path: Path) -> Path:
+        (tmp_path / "real" / "sub").mkdir(parents=True)
+        (tmp_path / "real" / "f.py").write_text("hi")
+        (tmp_path / "real" / "sub" / "loop").symlink_to("..")
+        (tmp_path / "alias").symlink_to("real")
+        return tmp_path
+
+    def test_links_shown_not_followed(self, linked_tree: Path) -> None:
+        """By default links are listed with their target and never entered"""
+        tc      = TreeCatt(str(linked_tree))
+        lines   = tc.get_tree_structure(linked_tree)
+
+        assert any(line.endswith("alias -> real") for line in lines)
+        assert any(line.endswith("loop -> ..") for line in lines)
+        assert [p.name for p in tc.iter_files()] == ["f.py"]
+
+    def test_follow_symlinks_scans_each_directory_once(self, linked_tree: Path) -> None:
+        """Following links terminates on loops and lists shared directories once"""
+        tc      = TreeCatt(str(linked_tree), follow_symlinks=True)
+        lines   = tc.get_tree_structure(linked_tree)
+
+        assert sum("already listed" in line for line in lines) == 2
+        assert len(list(tc.iter_files())) == 1
+        assert len(list(tc.build_index().iter_files())) == 1
+
+    def test_entries_stated_once(self, linked_tree: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Links, permissions, dates and checksums all come from the one stat per entry"""
+        calls   = []
+        real    = os.stat
+        monkeypatch.setattr(os, "stat", lambda *a, **k: calls.append(str(a[0])) or real(*a, **k))
+
+        tc      = TreeCatt(str(linked_tree), show_permissions=True, show_dates=True, show_checksums=True)
+        lines   = tc.get_tree_structure(tc.root_path)
+
+        assert any(line.endswith("alias -> real") for line in lines)
+        assert any("[rw" in line and "f.py" in line for line in lines)
+        assert calls.count(str(tc.root_path / "real" / "f.py")) == 1
+        # Links: the lstat, plus one stat through the link to sort it like its target
+        for name in ("alias", str(Path("real") / "sub" / "loop")):
+            assert calls.count(str(tc.root_path / name)) == 2
+
+
+class TestSpecialFiles:
+    """Test FIFO/device safety and one-file-system mode"""
+
+    @pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs os.mkfifo")
+    def test_fifo_labelled_never_opened(self, tmp_path: Path) -> None:
+        """A FIFO is labelled in the tree and skipped by every reader"""
+        from treecatt.features.file import read_file_bytes
+
+        (tmp_path / "app.py").write_text("x = 1")
+        os.mkfifo(tmp_path / "pipe")
+
+        tc      = TreeCatt(str(tmp_path), show_checksums=True)
+        lines   = tc.get_tree_structure(tmp_path)
+
+        assert any(line.endswith("pipe  [fifo]") for line in lines)
+        assert [p.name for p in tc.iter_files()] == ["app.py"]
+        assert read_file_bytes(tmp_path / "pipe", 1024) == b"[Not a regular file: fifo]"
+        assert tc.checksum_manager.digest(tmp_path / "pipe") is None
+
+    def test_one_file_system_stops_at_other_devices(self, tmp_path: Path) -> None:
+        """Directories on another device are shown but not entered"""
+        (tmp_path / "mnt").mkdir()
+        (tmp_path / "mnt" / "inner.py").write_text("x = 1")
+
+        tc = TreeCatt(str(tmp_path), one_file_system=True)
+        assert tc.root_device == tmp_path.stat().st_dev
+        assert len(list(tc.iter_files())) == 1
+
+        # Pretend the root lives on another device: every subdirectory is a mount
+        tc.root_device = -1
+        assert tc.get_tree_structure(tmp_path) == ["└── mnt/  [other filesystem]"]
+        assert list(tc.iter_files()) == []
+
+
+class TestLastCommit:
+    """Test per-file last-commit metadata"""
+
+    @staticmethod
+    def _git(repo: Path, *args: str) -> None:
+        import subprocess
+        subprocess.run(["git", "-c", "user.name=Ann", "-c", "user.email=ann@example.com", *args],
+                       cwd=repo, check=True, capture_output=True)
+
+    @pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+    def test_last_commit_per_file(self, tmp_path: Path) -> None:
+        """Each file gets the newest commit touching it; results are cached per HEAD"""
+        self._git(tmp_path, "init", "-q")
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "a.py").write_text("a = 1")
+        (tmp_path / "b.py").write_text("b = 1")
+        self._git(tmp_path, "add", ".")
+        self._git(tmp_path, "commit", "-qm", "first")
+        (tmp_path / "src" / "a.py").write_text("a = 2")
+        self._git(tmp_path, "commit", "-qam", "second")
+        (tmp_path / "untracked.py").write_text("u = 1")
+
+        tc      = TreeCatt(str(tmp_path / "src"), show_last_commit=True)
+        lines   = tc.get_tree_structure(tc.root_path)
+        commits = tc.git_manager.last_commits
+
+        assert set(commits) == {"a.py"}
+        assert lines[0].startswith("└── a.py  [" + commits["a.py"][0][:7])
+        assert lines[0].endswith(" Ann]")
+
+        tc      = TreeCatt(str(tmp_path), show_last_commit=True)
+        tc.get_tree_structure(tc.root_path)
+        commits = tc.git_manager.last_commits
+
+        assert set(commits) == {str(Path("src") / "a.py"), "b.py"}
+        assert commits[str(Path("src") / "a.py")][0] != commits["b.py"][0]
+        assert (tmp_path / ".git" / "treecatt-last-commit.json").exists()
+
+
+class TestSince:
+    """Test the changed-since-revision mode"""
+
+    @pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+    def test_only_changed_paths(self, tmp_path: Path) -> None:
+        """Committed, modified and untracked changes are shown; unchanged directories are not"""
+        git = TestLastCommit._git
+        git(tmp_path, "init", "-q")
+        for name in ("old/a.py", "src/b.py", "src/c.py", "gone.py"):
+            (tmp_path / name).parent.mkdir(exist_ok=True)
+            (tmp_path / name).write_text(name)
+        git(tmp_path, "add", ".")
+        git(tmp_path, "commit", "-qm", "base")
+        git(tmp_path, "tag", "base")
+        (tmp_path / "src" / "b.py").write_text("b = 2")
+        git(tmp_path, "commit", "-qam", "change b")
+        (tmp_path / "src" / "c.py").write_text("c = 2")
+        (tmp_path / "new.py").write_text("new")
+        (tmp_path / "gone.py").unlink()
+
+        tc      = TreeCatt(str(tmp_path), since="base")
+        names   = [line.split()[-1] for line in tc.get_tree_structure(tc.root_path)]
+        files   = sorted(p.relative_to(tmp_path).as_posix() for p in tc.iter_files())
+
+        assert files == ["new.py", "src/b.py", "src/c.py"]
+        assert "old/" not in names and "gone.py" not in names
+
+    def test_not_a_repository(self, tmp_path: Path) -> None:
+        """Outside a git repository, --since fails instead of showing nothing"""
+        (tmp_path / "a.py").write_text("a")
+        tc = TreeCatt(str(tmp_path), since="HEAD")
+        assert tc.changed_children is None
+
+    @pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+    def test_ref_is_not_an_option(self, tmp_path: Path) -> None:
+        """A REF starting with '-' is rejected as a revision, not run as a git option"""
+        TestLastCommit._git(tmp_path, "init", "-q")
+        (tmp_path / "a.py").write_text("a")
+        TestLastCommit._git(tmp_path, "add", ".")
+        TestLastCommit._git(tmp_path, "commit", "-qm", "base")
+
+        tc = TreeCatt(str(tmp_path), since=f"--output={tmp_path / 'written'}")
+        assert tc.changed_children is None
+        assert not (tmp_path / "written").exists()
+
+
+class TestDedupeContent:
+    """Test deduplicated content output"""
+
+    def test_repeats_reference_first_copy(self, tmp_path: Path, capfdbinary) -> None:
+        """Identical bodies are printed once; placeholders are never deduplicated"""
+        (tmp_path / "a.txt").write_text("same\n")
+        (tmp_path / "b.txt").write_text("same\n")
+        (tmp_path / "c.txt").write_text("other\n")
+        (tmp_path / "x.png").write_bytes(b"\x89PNG")
+        (tmp_path / "y.png").write_bytes(b"\x89PNG")
+        tc = TreeCatt(str(tmp_path), dedupe_content=True)
+        tc.generate_file_contents()
+
+        out = capfdbinary.readouterr().out
+        assert out.count(b"same\n") == 1
+        assert b"[identical to a.txt]" in out
+        assert b"other\n" in out
+        assert out.count(b"[Binary file]") == 2
+
+    @pytest.mark.parametrize("checksums", [False, True])
+    def test_placeholders_are_not_referenced(self, tmp_path: Path, capfdbinary, checksums: bool) -> None:
+        """Copies of a file shown as too large or binary repeat the placeholder, with or without --checksums"""
+        (tmp_path / "a.txt").write_text("x" * 2048)
+        (tmp_path / "b.txt").write_text("x" * 2048)
+        (tmp_path / "c.dat").write_bytes(b"\0\1\2")
+        (tmp_path / "d.dat").write_bytes(b"\0\1\2")
+        tc = TreeCatt(str(tmp_path), max_file_size=1024, show_checksums=checksums, dedupe_content=True)
+        tc.get_tree_structure(tc.root_path)
+        tc.generate_file_contents()
+
+        out = capfdbinary.readouterr().out
+        assert b"[identical to" not in out
+        assert out.count(b"[File to large") == 2
+        assert out.count(b"[Binary file]") == 2
+
+    def test_reuses_recorded_checksums(self, tmp_path: Path, capfdbinary, monkeypatch) -> None:
+        """With --checksums, repeats are detected from recorded digests without being read"""
+        import importlib
+        main = importlib.import_module("treecatt.main")
+        (tmp_path / "a.txt").write_text("same\n")
+        (tmp_path / "b.txt").write_text("same\n")
+        tc = TreeCatt(str(tmp_path), show_checksums=True, checksum_type="sha256", dedupe_content=True)
+        tc.get_tree_structure(tc.root_path)
+
+        loaded: List[Path] = []
+        load    = main.load_file_bytes
+        monkeypatch.setattr(main, "load_file_bytes", lambda path, size: loaded.append(path) or load(path, size))
+        tc.generate_file_contents()
+
+        assert b"[identical to a.txt]" in capfdbinary.readouterr().out
+        assert loaded == [tmp_path / "a.txt"]
+
+
+class TestCheckpoint:
+    """Test resumable checkpointed scans"""
+
+    def test_interrupted_run_resumes_with_identical_output(self, tmp_path: Path, capsys, monkeypatch) -> None:
+        """^C saves progress; the resumed run hashes only unfinished files and prints the same report"""
+        from treecatt.main import run_cli
+        from treecatt.features.checksum import ChecksumManager
+        root = tmp_path / "data"
+        for i in range(6):
+            (root / f"d{i % 2}").mkdir(parents=True, exist_ok=True)
+            (root / f"d{i % 2}" / f"f{i}.txt").write_text(str(i % 3))
+        age_tree(root)
+        checkpoint  = tmp_path / "scan.ckpt"
+        argv        = [str(root), "--tree", "--checksums", "sha256", "--duplicates", "--checkpoint", str(checkpoint)]
+
+        assert run_cli(argv) == 0
+        expected = capsys.readouterr().out
+        assert not checkpoint.exists()
+
+        hashed: List[Path] = []
+        digest_stream = ChecksumManager.digest_stream
+        def interrupt_after_three(self, f, size):
+            hashed.append(Path(f.name))
+            if len(hashed) > 3:
+                raise KeyboardInterrupt
+            return digest_stream(self, f, size)
+        monkeypatch.setattr(ChecksumManager, "digest_stream", interrupt_after_three)
+        assert run_cli(argv) == 130
+        assert checkpoint.exists()
+        capsys.readouterr()
+
+        hashed.clear()
+        monkeypatch.setattr(ChecksumManager, "digest_stream", lambda self, f, size:
+                            hashed.append(Path(f.name)) or digest_stream(self, f, size))
+        assert run_cli(argv + ["--resume"]) == 0
+        assert capsys.readouterr().out == expected
+        assert len(hashed) == 3
+        assert not checkpoint.exists()
+
+    def test_checkpoint_for_other_roots_is_ignored(self, tmp_path: Path) -> None:
+        """A checkpoint only restores progress for the roots it was saved for"""
+        from treecatt.features.checkpoint import Checkpoint
+        from treecatt.features.checksum import ChecksumManager
+        from treecatt.features.scancache import ListingCache
+        manager         = ChecksumManager('sha256', use_cache=True)
+        manager.cache   = {"/x/a": (1, 2, "ab")}
+        checkpoint      = Checkpoint(str(tmp_path / "c"), [Path("/x")], manager, ListingCache())
+        checkpoint.start()
+        checkpoint.stop()
+
+        other = ChecksumManager('sha256', use_cache=True)
+        assert not Checkpoint(str(tmp_path / "c"), [Path("/y")], other, ListingCache()).load()
+        assert Checkpoint(str(tmp_path / "c"), [Path("/x")], other, ListingCache()).load()
+        assert other.cache == {"/x/a": (1, 2, "ab")}
+
+    def test_saves_append_only_new_entries(self, tmp_path: Path) -> None:
+        """Each save appends what was computed since the last one; a torn last record is ignored"""
+        from treecatt.features.checkpoint import Checkpoint
+        from treecatt.features.checksum import ChecksumManager
+        from treecatt.features.scancache import ListingCache
+        for name in ("a", "b"):
+            (tmp_path / name).write_text(name)
+        age_tree(tmp_path)
+        path        = tmp_path / "ckpt"
+        manager     = ChecksumManager('sha256', use_cache=True)
+        checkpoint  = Checkpoint(str(path), [tmp_path], manager, ListingCache(), interval=3600)
+        checkpoint.start()
+
+        manager.digest(tmp_path / "a")
+        checkpoint.save()
+        assert len(path.read_text().splitlines()) == 2
+        manager.digest(tmp_path / "a")
+        manager.digest(tmp_path / "b")
+        checkpoint.save()
+        checkpoint.stop()
+        assert len(path.read_text().splitlines()) == 3
+
+        with open(path, "a") as f:
+            f.write('["d","/torn",1')
+        restored = ChecksumManager('sha256', use_cache=True)
+        assert Checkpoint(str(path), [tmp_path], restored, ListingCache()).load()
+        assert set(restored.cache) == {str(tmp_path / "a"), str(tmp_path / "b")}
+
+    def test_interrupt_stops_concurrent_roots(self, tmp_path: Path, monkeypatch) -> None:
+        """^C during a multi-root scan cancels the other scans instead of waiting for them"""
+        import signal
+        import threading
+        from treecatt.main import ScanCancelled, run_roots
+
+        roots = []
+        for name in ("slow", "fast"):
+            (tmp_path / name).mkdir()
+            for i in range(3):
+                (tmp_path / name / f"f{i}.txt").write_text(name)
+            roots.append(TreeCatt(str(tmp_path / name)))
+
+        stopped     = threading.Event()
+        interrupted = threading.Event()
+        entry_stat  = TreeCatt._entry_stat
+        def slow_stat(self, entry):
+            if self is roots[0] and not interrupted.is_set():
+                # ^C reaches the main thread while this scan is still running
+                interrupted.set()
+                signal.pthread_kill(threading.main_thread().ident, signal.SIGINT)
+                while not self.cancelled:
+                    threading.Event().wait(0.01)
+            return entry_stat(self, entry)
+        def tracked_scan():
+            try:
+                original_scan()
+            except ScanCancelled:
+                stopped.set()
+                raise
+
+        original_scan = roots[0].scan
+        monkeypatch.setattr(TreeCatt, "_entry_stat", slow_stat)
+        monkeypatch.setattr(roots[0], "scan", tracked_scan)
+        with pytest.raises(KeyboardInterrupt):
+            run_roots(roots)
+        # Joined by run_roots, unless ^C landed while its worker thread was being started
+        assert stopped.wait(5)
+
+
+class TestGitChecksums:
+    """Test git blob ID checksums"""
+
+    @pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+    def test_clean_files_use_index_ids(self, tmp_path: Path) -> None:
+        """Clean tracked files reuse index IDs; dirty and untracked files are hashed the same way"""
+        import subprocess
+
+        (tmp_path / "clean.py").write_text("x = 1\n")
+        (tmp_path / "dirty.py").write_text("y = 1\n")
+        TestLastCommit._git(tmp_path, "init", "-q")
+        TestLastCommit._git(tmp_path, "add", ".")
+        (tmp_path / "dirty.py").write_text("y = 2\n")
+        (tmp_path / "new.py").write_text("x = 1\n")
+
+        tc      = TreeCatt(str(tmp_path), show_checksums=True, checksum_type="git")
+        known   = tc.checksum_manager.known
+        assert [known.path(i) for i in known.iter_files()] == [tc.root_path / "clean.py"]
+
+        for name in ("clean.py", "dirty.py", "new.py"):
+            expected = subprocess.run(["git", "hash-object", name], cwd=tmp_path,
+                                      capture_output=True, text=True, check=True).stdout.strip()
+            assert tc.checksum_manager.digest(tc.root_path / name) == expected
+
+        assert tc.checksum_manager.known_hits == 1
+
+
+class TestLineStats:
+    """Test per-language line statistics"""
+
+    def test_count_lines_across_chunks(self, tmp_path: Path, monkeypatch) -> None:
+        """Lines and blank lines are counted the same whatever the chunk size"""
+        from treecatt.features import linestats
+
+        path = tmp_path / "a.py"
+        path.write_bytes(b"x = 1\r\n\r\n   \n\tdef f():\n        pass\n\n# end")
+        expected = linestats.count_lines(path)
+        assert expected == (7, 3, path.stat().st_size)
+
+        for chunk_size in (1, 2, 3, 5):
+            monkeypatch.setattr(linestats, "CHUNK_SIZE", chunk_size)
+            assert linestats.count_lines(path) == expected
+
+    def test_report_groups_by_language(self, tmp_path: Path) -> None:
+        """Files are grouped by language and binary files are skipped"""
+        from treecatt.features.linestats import LineStats
+
+        (tmp_path / "a.py").write_text("a = 1\n\nb = 2\n")
+        (tmp_path / "b.pyi").write_text("c: int\n")
+        (tmp_path / "data.bin2").write_bytes(b"\x00\x01\x02")
+        (tmp_path / "notes.xyz").write_text("hello")
+
+        stats = LineStats().collect(TreeCatt(str(tmp_path)).iter_files())
+
+        assert stats.languages == {"Python": [2, 4, 1, 20], ".xyz": [1, 1, 0, 5]}
+        assert stats.binary_count == 1
+
+
+class TestScanCache:
+    """Test the persistent directory listing cache"""
+
+    @staticmethod
+    def _age(*paths: Path) -> None:
+        for path in paths:
+            os.utime(path, (1_000_000_000, 1_000_000_000))
+
+    def test_listings_reused_across_runs(self, tmp_path: Path) -> None:
+        """Unchanged directories are served from the saved cache; changed ones are listed again"""
+        project = tmp_path / "project"
+        (project / "pkg").mkdir(parents=True)
+        (project / "pkg" / "a.py").write_text("a = 1")
+        (project / "b.py").write_text("b = 1")
+        self._age(project / "pkg", project)
+        cache = tmp_path / "scan.json"
+
+        assert TreeCatt(str(project), show_tree=True, scan_cache=str(cache)).run() == 0
+        assert cache.exists()
+
+        (project / "c.py").write_text("c = 1")
+        os.utime(project, (1_500_000_000, 1_500_000_000))
+        tc      = TreeCatt(str(project), scan_cache=str(cache))
+        files   = [p.name for p in tc.iter_files()]
+
+        assert files == ["a.py", "b.py", "c.py"]
+        assert (tc.listing_cache.hits, tc.listing_cache.misses) == (1, 1)
+        assert tc.listing_cache.kind(tc.root_path / "pkg") == "d"
+
+    def test_recent_directories_not_persisted(self, tmp_path: Path) -> None:
+        """A directory modified within the racy window is not saved for the next run"""
+        from treecatt.features.scancache import ListingCache
+
+        (tmp_path / "old").mkdir()
+        (tmp_path / "new").mkdir()
+        self._age(tmp_path / "old")
+        cache = ListingCache()
+        cache.list(tmp_path / "old")
+        cache.list(tmp_path / "new")
+        cache.save(tmp_path / "scan.json")
+
+        reloaded = ListingCache()
+        reloaded.load(tmp_path / "scan.json")
+        assert list(reloaded.entries) == [str(tmp_path / "old")]
+
+    def test_racy_listing_read_again(self, tmp_path: Path) -> None:
+        """A listing taken in the directory's mtime tick is not reused, even in memory"""
+        from treecatt.features.scancache import ListingCache
+
+        cache   = ListingCache()
+        mtime   = os.stat(tmp_path).st_mtime_ns
+        assert cache.list(tmp_path) == []
+        # A coarse-mtime filesystem: the new file leaves the directory's mtime unchanged
+        (tmp_path / "late.txt").write_text("x")
+        os.utime(tmp_path, ns=(mtime, mtime))
+        assert cache.list(tmp_path) == ["late.txt"]
+
+        age_tree(tmp_path)
+        cache.list(tmp_path)
+        assert cache.list(tmp_path) == ["late.txt"] and cache.hits == 1
+
+    def test_racy_digest_not_cached(self, tmp_path: Path) -> None:
+        """A file hashed in its mtime tick is hashed again; older files come from the cache"""
+        path    = tmp_path / "a.txt"
+        path.write_text("one")
+        st      = path.stat()
+        manager = ChecksumManager('md5', use_cache=True)
+        first   = manager.digest(path)
+        path.write_text("two")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+        assert manager.digest(path) != first
+        age_tree(tmp_path)
+        manager.digest(path)
+        assert str(path) in manager.cache
+
+    def test_warm_cache_stats(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """With a warm cache, the tree stats each file once and the content pass none"""
+        project = tmp_path / "project"
+        (project / "pkg").mkdir(parents=True)
+        for i in range(2000):
+            (project / f"file{i:04d}.py").write_text("x")
+        self._age(project / "pkg", project)
+        cache = tmp_path / "scan.json"
+        assert TreeCatt(str(project), show_tree=True, scan_cache=str(cache)).run() == 0
+
+        calls   = []
+        real    = os.stat
+        monkeypatch.setattr(os, "stat", lambda *a, **k: calls.append(a[0]) or real(*a, **k))
+
+        tc = TreeCatt(str(project), show_tree=True, scan_cache=str(cache))
+        calls.clear()
+        tc.get_tree_structure(tc.root_path)
+        assert tc.listing_cache.misses == 0
+        assert len(calls) <= 2000 + 10
+        # Once, validating its cached listing
+        assert [str(c) for c in calls].count(str(project / "pkg")) == 1
+        calls.clear()
+        assert len(list(tc.iter_files())) == 2000
+        assert len(calls) < 10
+
+
+class TestGentleMode:
+    """Test the low-impact I/O mode"""
+
+    def test_token_bucket_waits_for_debt(self, monkeypatch) -> None:
+        """Consuming past the burst sleeps long enough to repay it at the rate"""
+        from treecatt.features import throttle
+
+        slept = []
+        monkeypatch.setattr(throttle.time, "sleep", slept.append)
+        monkeypatch.setattr(throttle.time, "monotonic", lambda: 100.0)
+
+        bucket = throttle.TokenBucket(rate=1000)
+        assert bucket.consume(1000) == 0
+        assert bucket.consume(500) == pytest.approx(0.5)
+        assert slept == [pytest.approx(0.5)]
+
+    def test_reads_are_accounted(self, tmp_path: Path) -> None:
+        """All readers go through the throttle while it is installed"""
+        from treecatt.features.file import read_file_bytes, set_io_throttle
+        from treecatt.features.throttle import IOThrottle
+
+        (tmp_path / "a.py").write_bytes(b"x" * 1000)
+        io_throttle = IOThrottle(bytes_per_second=1e9, files_per_second=1e9)
+        set_io_throttle(io_throttle)
+        try:
+            assert read_file_bytes(tmp_path / "a.py", 1024) == b"x" * 1000
+            ChecksumManager('md5').digest(tmp_path / "a.py")
+        finally:
+            set_io_throttle(None)
+
+        # Reading the same file again is served from the pages kept cached
+        assert (io_throttle.files, io_throttle.bytes) == (1, 1000)
+        read_file_bytes(tmp_path / "a.py", 1024)
+        assert io_throttle.files == 1
+
+    def test_pages_dropped_once_after_use(self, tmp_path: Path, monkeypatch) -> None:
+        """Pages are dropped when a file leaves the cache budget or the run ends, not on every close"""
+        from treecatt.features.file import read_file_bytes, set_io_throttle
+        from treecatt.features.throttle import IOThrottle
+
+        dropped: List[int] = []
+        monkeypatch.setattr(IOThrottle, "drop_cache", staticmethod(dropped.append))
+        for name in ("a.py", "b.py", "c.py"):
+            (tmp_path / name).write_bytes(b"x" * 1000)
+        io_throttle = IOThrottle(bytes_per_second=1e9, files_per_second=1e9, cache_budget=2000)
+        set_io_throttle(io_throttle)
+        try:
+            for name in ("a.py", "a.py", "b.py"):
+                read_file_bytes(tmp_path / name, 4096)
+            assert dropped == []
+            read_file_bytes(tmp_path / "c.py", 4096)
+            assert len(dropped) == 1 and set(io_throttle.cached) == {
+                (st.st_dev, st.st_ino) for st in ((tmp_path / "b.py").stat(), (tmp_path / "c.py").stat())}
+        finally:
+            set_io_throttle(None)
+        io_throttle.finish()
+
+        assert len(dropped) == 3
+        assert (io_throttle.files, io_throttle.bytes) == (3, 3000)
+
+
+class TestMultiRoot:
+    """Test scanning several roots in one run"""
+
+    def _make_roots(self, tmp_path: Path) -> List[Path]:
+        roots = []
+        for name in ("svc_a", "svc_b", "svc_c"):
+            (tmp_path / name).mkdir()
+            (tmp_path / name / f"{name}.py").write_text(f"name = '{name}'")
+            roots.append(tmp_path / name)
+        (tmp_path / "svc_c" / "shared.py").write_text("shared = 1")
+        (tmp_path / "svc_a" / "shared.py").write_text("shared = 1")
+        return roots
+
+    def test_roots_printed_in_order_with_cross_root_duplicates(self, tmp_path: Path, capsys) -> None:
+        """Roots are rendered in argument order and duplicates span roots"""
+        from treecatt.main import run_cli
+
+        roots = self._make_roots(tmp_path)
+        assert run_cli([str(r) for r in roots] + ["--tree", "--duplicates"]) == 0
+        out = capsys.readouterr().out
+
+        positions = [out.index(f"Analyzing: {r}") for r in roots]
+        assert positions == sorted(positions)
+        assert out.count("TreeCatt v") == 1
+        duplicates = out[out.index("Duplicate files found:"):]
+        assert duplicates.index(str(Path("svc_a") / "shared.py")) < duplicates.index(str(Path("svc_c") / "shared.py"))
+
+    def test_roots_share_checksum_state(self, tmp_path: Path) -> None:
+        """Every root uses the first root's checksum manager"""
+        from treecatt.main import run_roots
+
+        roots   = self._make_roots(tmp_path)
+        first   = TreeCatt(str(roots[0]), show_checksums=True, show_tree=True)
+        others  = [TreeCatt(str(r), show_checksums=True, show_tree=True,
+                            checksum_manager=first.checksum_manager) for r in roots[1:]]
+
+        assert run_roots([first] + others) == 0
+        assert all(tc.checksum_manager is first.checksum_manager for tc in others)
+        assert len(first.checksum_manager.get_duplicates()) == 1
+
+    def test_duplicate_order_ignores_thread_timing(self, tmp_path: Path) -> None:
+        """Groups and their files are ordered by root and tree position, not recording order"""
+        import hashlib
+
+        roots = [tmp_path / "a", tmp_path / "b"]
+        files = {root: [root / "x.py", root / "y.py"] for root in roots}
+
+        reports = []
+        for order in (roots, roots[::-1]):
+            manager = ChecksumManager('md5')
+            manager.order_by_roots(roots)
+            for root in order:
+                # "y" content is recorded first in b, "x" first in a
+                for path in (files[root] if root == roots[0] else files[root][::-1]):
+                    manager.record(hashlib.md5(path.stem.encode()).hexdigest(), path, 1)
+            reports.append(list(manager.get_duplicates().values()))
+
+        assert reports[0] == reports[1] == [[files[r][0] for r in roots], [files[r][1] for r in roots]]
+
+
+class TestArchives:
+    """Test archives as virtual directories"""
+
+    @pytest.fixture
+    def artifacts(self, tmp_path: Path) -> Path:
+        import io
+        import tarfile
+        import zipfile
+
+        with zipfile.ZipFile(tmp_path / "lib.jar", "w") as archive:
+            archive.writestr("com/app/Main.java", "class Main {}\n")
+            archive.writestr("com/app/.env", "SECRET=1\n")
+            archive.writestr("big.txt", "x" * 5000)
+        with tarfile.open(tmp_path / "src.tar.gz", "w:gz") as archive:
+            data = b"class Main {}\n"
+            info = tarfile.TarInfo("./pkg/Main.java")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+        return tmp_path
+
+    def test_members_listed_and_checksummed(self, artifacts: Path) -> None:
+        """Members appear under their archive; equal members are duplicates across archives"""
+        tc      = TreeCatt(str(artifacts), archives=True, show_checksums=True, archive_member_limit=1000)
+        lines   = tc.get_tree_structure(artifacts)
+        text    = "\n".join(lines)
+
+        assert lines[0].startswith("├── lib.jar ") and lines[0].endswith("[archive: 2 files]")
+        assert "│   │       └── Main.java  [" in text
+        assert ".env" not in text
+        assert "big.txt  [not read: over member limit]" in text
+
+        duplicates = tc.checksum_manager.get_duplicates()
+        assert [sorted(str(p.relative_to(artifacts)) for p in paths) for paths in duplicates.values()] == [
+            [str(Path("lib.jar") / "com" / "app" / "Main.java"), str(Path("src.tar.gz") / "pkg" / "Main.java")]
+        ]
+
+    def test_member_contents_streamed_and_searched(self, artifacts: Path, capfdbinary) -> None:
+        """Contents of matching members are written without extracting anything"""
+        tc = TreeCatt(str(artifacts), archives=True, search_content="class main", max_file_size=1000)
+        tc.generate_file_contents()
+        out = capfdbinary.readouterr().out
+
+        assert b"Path: lib.jar/com/app/Main.java\n" in out
+        assert b"Path: src.tar.gz/pkg/Main.java\n" in out
+        assert out.count(b"class Main {}") == 2
+        assert b"big.txt" not in out
+        assert sorted(p.name for p in artifacts.iterdir()) == ["lib.jar", "src.tar.gz"]
+
+
+class TestMerkleAndCompare:
+    """Test directory digests and two-tree comparison"""
+
+    def _make_tree(self, base: Path, changed: str) -> Path:
+        (base / "pkg").mkdir(parents=True)
+        (base / "pkg" / "a.py").write_text("a = 1")
+        (base / "b.py").write_text(changed)
+        return base
+
+    def test_directory_digests(self, tmp_path: Path) -> None:
+        """Identical subtrees share a digest; a changed file changes its ancestors"""
+        left    = self._make_tree(tmp_path / "left", "b = 1")
+        right   = self._make_tree(tmp_path / "right", "b = 2")
+
+        lines_l, root_l = TreeCatt(str(left), show_checksums=True)._build_tree(left, "", 0)
+        lines_r, root_r = TreeCatt(str(right), show_checksums=True)._build_tree(right, "", 0)
+
+        assert root_l and root_r and root_l != root_r
+        assert lines_l[0] == lines_r[0]
+        assert lines_l[0].startswith("├── pkg/  [")
+
+    def test_compare_reports_only_differences(self, tmp_path: Path) -> None:
+        """Compare lists modified, added and removed entries"""
+        left    = self._make_tree(tmp_path / "left", "b = 1")
+        right   = self._make_tree(tmp_path / "right", "b = 2")
+        (left / "old.py").write_text("x")
+        (right / "pkg" / "new.py").write_text("y")
+        age_tree(left)
+
+        cache   = tmp_path / "digests.json"
+        tc      = TreeCatt(str(left), show_checksums=True, checksum_cache=str(cache))
+        assert tc.compare(str(right)) == 1
+
+        comparer_diffs = sorted(TreeComparer(tc.checksum_manager, tc._list_dir).compare(left, right))
+        assert comparer_diffs == [("+", str(Path("pkg") / "new.py")), ("-", "old.py"), ("M", "b.py")]
+        assert cache.exists()
+
+        cached = ChecksumManager('md5', use_cache=True)
+        cached.load_cache(cache)
+        assert str(left / "pkg" / "a.py") in cached.cache
+
+    @pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs FIFOs")
+    def test_special_files_compared_by_type(self, tmp_path: Path) -> None:
+        """FIFOs are never opened: matching FIFOs are equal, a FIFO replaced by a file is a type change"""
+        left    = self._make_tree(tmp_path / "left", "b = 1")
+        right   = self._make_tree(tmp_path / "right", "b = 1")
+        for side in (left, right):
+            os.mkfifo(side / "pipe")
+        os.mkfifo(left / "was_pipe")
+        (right / "was_pipe").write_text("now a file")
+
+        tc = TreeCatt(str(left))
+        assert TreeComparer(ChecksumManager(), tc._list_dir).compare(left, right) == [("T", "was_pipe")]
+
+    def test_default_ignores_do_not_hide_differences(self, tmp_path: Path) -> None:
+        """Names ignored for display (README.md, keys, build/) are still compared; --ignore applies"""
+        left    = self._make_tree(tmp_path / "left", "b = 1")
+        right   = self._make_tree(tmp_path / "right", "b = 1")
+        for side, text in ((left, "one"), (right, "two")):
+            (side / "README.md").write_text(text)
+            (side / "server.key").write_text(text)
+            (side / "build").mkdir()
+            (side / "build" / "out.bin").write_text(text)
+        (right / "LICENSE").write_text("MIT")
+
+        assert TreeCatt(str(left), show_checksums=True).compare(str(right)) == 1
+        comparer = TreeComparer(ChecksumManager(), TreeCatt(str(left))._list_dir_raw)
+        assert sorted(comparer.compare(left, right)) == [
+            ("+", "LICENSE"), ("M", "README.md"), ("M", str(Path("build") / "out.bin")), ("M", "server.key")]
+
+        tc = TreeCatt(str(left), show_checksums=True, ignore_patterns=["README.md", "*.key", "build", "LICENSE"])
+        assert tc.compare(str(right)) == 0
+
+
+class TestServer:
+    """Test the warm server request path"""
+
+    def test_request_round_trip(self, tmp_path: Path) -> None:
+        """A forwarded request returns the same output and exit code"""
+        import io
+        import json
+        import socket
+        from treecatt.main import run_cli
+        from treecatt.features.daemon import WarmState, handle_request, read_response
+
+        (tmp_path / "app.py").write_text("print('warm')\n")
+        age_tree(tmp_path)
+        state = WarmState()
+
+        for _ in range(2):
+            server, client = socket.socketpair()
+            with server, client:
+                request = {'argv': ['.', '--checksums', 'md5'], 'cwd': str(tmp_path)}
+                client.sendall(json.dumps(request).encode() + b"\n")
+                handle_request(server, lambda argv: run_cli(argv, state))
+
+                out, err = io.BytesIO(), io.BytesIO()
+                assert read_response(client, out, err) == 0
+                assert b"print('warm')" in out.getvalue()
+
+        assert state.listings.hits >= 1
+        assert str(tmp_path / "app.py") in state.digest_cache('md5')
+
+    def test_server_lost_mid_request(self, tmp_path: Path, capsys) -> None:
+        """A server dying before any output falls back to a local run; after output, it fails"""
+        import socket
+        import threading
+        from treecatt.features.daemon import FRAME_HEADER, STDOUT_FRAME, run_client
+
+        socket_path = str(tmp_path / "s")
+        server      = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        server.listen(2)
+
+        def serve(frames: List[bytes]) -> None:
+            conn, _ = server.accept()
+            with conn:
+                conn.makefile('rb').readline()
+                for frame in frames:
+                    conn.sendall(FRAME_HEADER.pack(STDOUT_FRAME, len(frame)) + frame)
+
+        with server:
+            for frames, expected in (([], None), ([b""], None), ([b"partial"], 1)):
+                thread = threading.Thread(target=serve, args=(frames,))
+                thread.start()
+                assert run_client(["."], socket_path) == expected
+                thread.join()
+
+        err = capsys.readouterr().err
+        assert "running locally" in err and "mid-response" in err
+
+    def test_git_status_reused(self, tmp_path: Path) -> None:
+        """Git status is reused while the repository signature is unchanged"""
+        from treecatt.features.daemon import WarmState
+
+        state = WarmState(git_ttl=60)
+        assert state.git_manager(tmp_path) is state.git_manager(tmp_path)
+        assert WarmState(git_ttl=0).git_manager(tmp_path) is not None
+
+
+class TestNearDuplicates:
+    """Test MinHash near-duplicate detection"""
+
+    def test_groups_near_copies(self, tmp_path: Path) -> None:
+        """Files differing by a header line are grouped; unrelated files are not"""
+        body = "\n".join(f"def function_{i}(value):\n    return value * {i}" for i in range(60))
+        (tmp_path / "original.py").write_text("# version 1.0\n" + body)
+        (tmp_path / "vendored.py").write_text("# version 2.3 (vendored)\n" + body)
+        (tmp_path / "other.py").write_text(" ".join(f"word{i}" for i in range(300)))
+
+        tc          = TreeCatt(str(tmp_path), near_duplicates=0.8)
+        groups      = tc.find_near_duplicates().get_near_duplicates()
+
+        assert len(groups) == 1
+        score, files = groups[0]
+        assert score >= 0.8
+        assert sorted(f.name for f in files) == ["original.py", "vendored.py"]
+
+    def test_chains_are_not_merged(self) -> None:
+        """Each group is similar pairwise, and reports its real lowest pairwise similarity"""
+        from treecatt.features.similarity import NearDuplicateDetector
+
+        words       = [f"w{i}".encode() for i in range(250)]
+        detector    = NearDuplicateDetector(threshold=0.8)
+        for k in range(5):
+            # Each file slides 10 words further: neighbours match, the ends do not
+            detector.add(Path(os.sep, f"f{k}.txt"), b" ".join(words[10 * k:10 * k + 200]))
+
+        groups = detector.get_near_duplicates()
+        assert groups
+        for score, files in groups:
+            ids     = [next(i for i in range(len(detector.file_rows)) if detector.path(i) == f) for f in files]
+            pairs   = [detector.similarity(a, b) for pos, a in enumerate(ids) for b in ids[pos + 1:]]
+            assert score == min(pairs) >= 0.8
+            assert not {Path(os.sep, "f0.txt"), Path(os.sep, "f4.txt")} <= set(files)
+
+    def test_cli_path_after_flag(self, tmp_path: Path, capsys) -> None:
+        """A path after --near-duplicates is a path, not a threshold"""
+        from treecatt.main import run_cli
+
+        body = " ".join(f"word{i}" for i in range(300))
+        (tmp_path / "a.txt").write_text(body)
+        (tmp_path / "b.txt").write_text(body + " extra")
+
+        assert run_cli(["--tree", "--near-duplicates", str(tmp_path)]) == 0
+        assert "Near-duplicate files found:" in capsys.readouterr().out
+        assert run_cli(["--tree", "--near-duplicates", "--near-threshold", "1.5", str(tmp_path)]) == 1
+
+    def test_band_selection(self) -> None:
+        """LSH bands multiply out to the signature length"""
+        from treecatt.features.similarity import choose_bands
+
+        bands, rows = choose_bands(0.8, 64)
+        assert bands * rows == 64
+        assert abs((1 / bands) ** (1 / rows) - 0.8) < 0.1
+
+
+class TestStartup:
+    """Test the startup-time budget"""
+
+    IMPORT_BUDGET_US    = 150_000
+    LAZY_MODULES        = {'subprocess', 'hashlib', 'datetime', 'calendar', 'socket', 'json'}
+
+    @pytest.mark.slow
+    def test_version_import_time(self) -> None:
+        """`treecatt --version` stays under budget and skips feature modules"""
+        import os
+        import subprocess
+        import sys
+
+        src     = Path(__file__).resolve().parent.parent / "src"
+        env     = dict(os.environ, PYTHONPATH=str(src), TREECATT_NO_DAEMON="1")
+        result  = subprocess.run([sys.executable, "-X", "importtime", "-m", "treecatt", "--version"],
+                                 capture_output=True, text=True, env=env, check=True)
+
+        imports = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, cumulative, name = line.split("|")
+                if cumulative.strip().isdigit():
+                    imports[name.strip()] = int(cumulative)
+
+        assert "TreeCatt" in result.stdout
+        assert not self.LAZY_MODULES & imports.keys()
+        assert imports["treecatt"] < self.IMPORT_BUDGET_US
+
+
+class TestTreeIndex:
+    """Test the columnar tree index"""
+
+    def test_index_matches_tree(self, tmp_path: Path) -> None:
+        """Index holds the same entries as the tree, in sorted order"""
+        (tmp_path / "b_dir").mkdir()
+        (tmp_path / "b_dir" / "inner.py").write_text("x = 1")
+        (tmp_path / "a.py").write_text("print(1)")
+        (tmp_path / "node_modules").mkdir()
+
+        tc      = TreeCatt(str(tmp_path))
+        index   = tc.build_index()
+        paths   = [index.relpath(i) for i in index.iter_sorted()]
+
+        assert paths == ["b_dir", str(Path("b_dir") / "inner.py"), "a.py"]
+        inner = list(index.iter_files())[0]
+        assert index.path(inner) == tc.root_path / "b_dir" / "inner.py"
+
+    def test_index_columns(self, tmp_path: Path) -> None:
+        """Names are interned and stat data lands in the columns"""
+        for sub in ("one", "two"):
+            (tmp_path / sub).mkdir()
+            (tmp_path / sub / "setup.py").write_text("abc")
+
+        index   = TreeIndex.scan(tmp_path)
+        files   = list(index.iter_files())
+
+        assert len(files) == 2
+        assert index.names.count("setup.py") == 1
+        assert all(index.sizes[i] == 3 for i in files)
+        assert [index.relpath(i) for i in files] == [str(Path("one") / "setup.py"), str(Path("two") / "setup.py")]
+
+
+    def test_paths_and_digest_column(self) -> None:
+        """Rows added by path are found back, with their fixed-width digests"""
+        index   = TreeIndex(Path("/"), digest_size=2)
+        first   = index.add_path(Path("/a/b/c.txt"), 3)
+        second  = index.add_path(Path("/a/d.txt"), 4)
+        index.set_digest(first, b"\x01\x02")
+
+        assert index.find(Path("/a/b/c.txt")) == first
+        assert index.find(Path("/a/d.txt")) == second
+        assert index.find(Path("/a/b")) is None
+        assert index.find(Path("/a/missing.txt")) is None
+        assert index.digest(first) == b"\x01\x02" and index.digest(second) == b"\0\0"
+        assert index.path(first) == Path("/a/b/c.txt")
+
+    def test_duplicates_tracked_by_row(self, tmp_path: Path) -> None:
+        """Recorded digests live in index columns; duplicates are found by sorting rows on them"""
+        manager = ChecksumManager('md5')
+        for name, content in (("a", "same"), ("b", "other"), ("sub/c", "same")):
+            (tmp_path / name).parent.mkdir(exist_ok=True)
+            (tmp_path / name).write_text(content)
+            manager.record(manager.digest(tmp_path / name), tmp_path / name)
+
+        digest = manager.digest(tmp_path / "a")
+        assert manager.get_duplicates() == {digest: [tmp_path / "a", tmp_path / "sub" / "c"]}
+        assert manager.recorded_digest(tmp_path / "sub" / "c") == digest
+        assert len(manager.records.digests) == len(manager.records) * 16
+
+class TestBundle:
+    """Test bundle output"""
+
+    def test_bundle_index_offsets(self, tmp_path: Path) -> None:
+        """Index entries point at the exact raw bytes of each file"""
+        import json
+        from treecatt.features.bundle import read_bundle_entry
+
+        project = tmp_path / "project"
+        project.mkdir()
+        (project / "a.py").write_bytes(b"caf\xe9 = 1\n")
+        (project / "b.txt").write_text("hello\n")
+        (project / "img.png").write_bytes(b"\x89PNG\x00")
+        out = tmp_path / "out.bundle"
+
+        tc = TreeCatt(str(project), bundle_path=str(out), show_checksums=True)
+        assert tc.run() == 0
+
+        entries = [json.loads(line) for line in (tmp_path / "out.bundle.idx").read_text().splitlines()]
+        assert [e["path"] for e in entries] == ["a.py", "b.txt"]
+        for entry in entries:
+            raw = read_bundle_entry(out, entry["offset"], entry["length"])
+            assert raw == (project / entry["path"]).read_bytes()
+            assert len(entry["checksum"]) == 32
+
+    def test_bundle_checksums_without_rereading(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Recorded digests are reused (one open per file per pass); without --checksums, SHA-256 is recorded"""
+        import hashlib
+        import json
+        from treecatt.features import file as file_module
+
+        project = tmp_path / "project"
+        project.mkdir()
+        (project / "a.py").write_text("a = 1\n" * 5000)
+        out = tmp_path / "out.bundle"
+
+        opened = []
+        monkeypatch.setattr(file_module, "open", lambda path, *a, **k: opened.append(Path(path)) or open(path, *a, **k),
+                            raising=False)
+        assert TreeCatt(str(project), bundle_path=str(out), show_checksums=True).run() == 0
+        assert opened.count(project / "a.py") == 2
+        entry = json.loads((tmp_path / "out.bundle.idx").read_text())
+        assert entry["checksum"] == hashlib.md5((project / "a.py").read_bytes()).hexdigest()
+
+        assert TreeCatt(str(project), bundle_path=str(out)).run() == 0
+        entry = json.loads((tmp_path / "out.bundle.idx").read_text())
+        assert entry["checksum"] == hashlib.sha256((project / "a.py").read_bytes()).hexdigest()
+        assert entry["length"] == (project / "a.py").stat().st_size
+
+    def test_bundle_inside_root_skips_itself(self, tmp_path: Path) -> None:
+        """A bundle written into the scanned root never contains itself or its index"""
+        import json
+
+        (tmp_path / "a.py").write_text("a = 1\n")
+        out = tmp_path / "project.bundle"
+        for _ in range(2):
+            tc = TreeCatt(str(tmp_path), bundle_path=str(out))
+            assert tc.run() == 0
+
+            entries = [json.loads(line) for line in (tmp_path / "project.bundle.idx").read_text().splitlines()]
+            assert [e["path"] for e in entries] == ["a.py"]
+            assert not any("project.bundle" in line for line in tc.tree_lines)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
\ No newline at end of file